@@ -1 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Line lists of the absorption models, stored as one netCDF group per model.
+"""
 
+import os
+from functools import lru_cache
+from typing import Dict
+
+import numpy as np
+from netCDF4 import Dataset
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+@lru_cache(maxsize=None)
+def _read_group(filename: str, group: str) -> Dict[str, np.ndarray]:
+    with Dataset(os.path.join(PATH, filename), mode='r') as nc:
+        return {k: v[:].data for k, v in nc.groups[group].variables.items()}
+
+
+def read_group(filename: str, group: str) -> Dict[str, np.ndarray]:
+    """Read the variables of a line list group. The file is read once per group
+    and kept in memory, so that reloading the line list modules (at every
+    ``set_ll``) does not open the netCDF file again.
+
+    :meta private:
+
+    Args:
+        filename (str): Name of the netCDF file in this package.
+        group (str): Name of the group (absorption model).
+
+    Returns:
+        Dict[str, numpy.ndarray]: Copies of the variables of the group, which the
+        callers are free to modify (e.g. with the amu parameters).
+    """
+    return {k: v.copy() for k, v in _read_group(filename, group).items()}
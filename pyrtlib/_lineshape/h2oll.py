@@ -45,18 +45,17 @@
 
 # nc.close()
 
-import os
-from netCDF4 import Dataset
+import numpy as np
 
 from pyrtlib.absorption_model import H2OAbsModel
+from pyrtlib._lineshape import read_group
 
-PATH = os.path.dirname(os.path.abspath(__file__))
-nc = Dataset(os.path.join(PATH, "h2o_lineshape.nc"), mode='r')
-
-d = nc.groups[H2OAbsModel.model]
-mtx = d.variables['mtx'][:].data
-ctr = d.variables['ctr'][:].data
-reftline = d.variables['reftline'][:].data.item()
+d = read_group("h2o_lineshape.nc", H2OAbsModel.model)
+# column-major copy, so that every line parameter sliced below is a
+# contiguous float64 array rather than a strided view of the table
+mtx = np.asfortranarray(d['mtx'], dtype=np.float64)
+ctr = d['ctr']
+reftline = d['reftline'].item()
 
 fl = mtx[:, 1]
 s1 = mtx[:, 2]
@@ -92,8 +91,8 @@ if H2OAbsModel.model in ['R21SD', 'R22SD']:
     d2 = mtx[:, 18] / 1000.0
     d2s = mtx[:, 19] / 1000.0
 if H2OAbsModel.model == 'R20SD':
-    d2air = d.variables['d2air'][:].data.item()
-    d2self = d.variables['d2self'][:].data.item()
+    d2air = d['d2air'].item()
+    d2self = d['d2self'].item()
 
 
 reftcon = ctr[0]
@@ -102,7 +101,6 @@ xcf = ctr[2]
 cs = ctr[3]
 xcs = ctr[4]
 
-nc.close()
 
 # indx = np.where(np.isnan(xh))
 # xh[indx] = x[indx]
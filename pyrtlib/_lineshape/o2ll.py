@@ -25,31 +25,25 @@
 
 # nc.close()
 
-import os
-from netCDF4 import Dataset
 
 from pyrtlib.absorption_model import O2AbsModel
+from pyrtlib._lineshape import read_group
 
-PATH = os.path.dirname(os.path.abspath(__file__))
-nc = Dataset(os.path.join(PATH, "o2_lineshape.nc"), mode='r')
+d = read_group("o2_lineshape.nc", O2AbsModel.model)
 
-d = nc.groups[O2AbsModel.model]
-
-f = d.variables['f'][:].data
-s300 = d.variables['s300'][:].data
-be = d.variables['be'][:].data
-wb300 = d.variables['wb300'][:].data.item()
-x = d.variables['x'][:].data.item()
-w300 = d.variables['w300'][:].data
+f = d['f']
+s300 = d['s300']
+be = d['be']
+wb300 = d['wb300'].item()
+x = d['x'].item()
+w300 = d['w300']
 if O2AbsModel.model in ['R98', 'R03', 'R17', 'R18', 'R19', 'R19SD']:
-    v = d.variables['v'][:].data
-    y300 = d.variables['y300'][:].data
+    v = d['v']
+    y300 = d['y300']
 else:
-    y0 = d.variables['y0'][:].data
-    y1 = d.variables['y1'][:].data
-    g0 = d.variables['g0'][:].data
-    g1 = d.variables['g1'][:].data
-    dnu0 = d.variables['dnu0'][:].data
-    dnu1 = d.variables['dnu1'][:].data
-
-nc.close()
+    y0 = d['y0']
+    y1 = d['y1']
+    g0 = d['g0']
+    g1 = d['g1']
+    dnu0 = d['dnu0']
+    dnu1 = d['dnu1']
@@ -18,17 +18,13 @@
 
 # nc.close()
 
-import os
-from netCDF4 import Dataset
 
 from pyrtlib.absorption_model import O3AbsModel
+from pyrtlib._lineshape import read_group
 
-PATH = os.path.dirname(os.path.abspath(__file__))
-nc = Dataset(os.path.join(PATH, "o3_lineshape.nc"), mode='r')
-
-d = nc.groups[O3AbsModel.model]
-mtx = d.variables['mtx'][:].data
-reftline = d.variables['reftline'][:].data.item()
+d = read_group("o3_lineshape.nc", O3AbsModel.model)
+mtx = d['mtx']
+reftline = d['reftline'].item()
 
 fl = mtx[:, 1]
 s1 = mtx[:, 2]
@@ -36,5 +32,3 @@ b = mtx[:, 3]
 w = mtx[:, 4] / 1000.0
 x = mtx[:, 5]
 sr = mtx[:, 6]
-
-nc.close()
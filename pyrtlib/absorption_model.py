@@ -5,15 +5,34 @@ This class contains the absorption model used in pyrtlib.
 
 import types
 import os
-from typing import Tuple, Union, List, Optional, Dict
+from typing import Callable, Tuple, Union, List, Optional, Dict
 from netCDF4 import Dataset
 
 import numpy as np
 
 from pyrtlib.climatology import AtmosphericProfiles as atmp
-from .utils import dilec12, _dcerror, constants, gas_mass, import_lineshape
+from .utils import dilec12, _dcerror, _humlicek_w4, constants, gas_mass, import_lineshape
 
 PATH = os.path.dirname(os.path.abspath(__file__))
+_RVAP = constants('Rwatvap')[0] * 1e-05  # [J kg-1 K-1] -> [hPa * m2 g-1 K-1]
+_DB2NP = np.log(10.0) * 0.1  # dB to nepers
+# _dcerror works on scalars only
+_dcerror_points = np.vectorize(_dcerror, otypes=[np.complex128])
+# N2 continuum coefficients (l, m, n, frequency dependence) for each model
+_N2_COEFFS = {
+    'R98': (6.4e-14, 3.55, 1, False),
+    'R03': (6.5e-14, 3.6, 1.29, True),
+    'R16': (6.5e-14, 3.6, 1.34, True),
+    'R17': (6.5e-14, 3.6, 1.34, True),
+    'R18': (6.5e-14, 3.6, 1.34, True),
+    'R19': (6.5e-14, 3.6, 1.34, True),
+    'R19SD': (6.5e-14, 3.6, 1.34, True),
+    'R20': (9.95e-14, 3.22, 1, True),
+    'R20SD': (9.95e-14, 3.22, 1, True),
+    'R21SD': (9.95e-14, 3.22, 1, True),
+    'R22': (9.95e-14, 3.22, 1, True),
+    'R22SD': (9.95e-14, 3.22, 1, True),
+}
 
 class AbsModelError(Exception):
     """Exception raised for errors in the input model.
@@ -145,21 +164,17 @@ class LiqAbsModel(AbsModel):
             * PWR 12/14/98 Temp dependence of eps2 eliminated to agree with MPM93 
             * PWR 06/05/15 Using dilec12 for complex dielectric constant
         """
-        if water <= 0:
-            abliq = 0
-            return abliq
-
         if LiqAbsModel.model in ['R03', 'R98']:
             theta1 = 1.0 - 300.0 / temp
-            eps0 = 77.66 - np.dot(103.3, theta1)
-            eps1 = np.dot(0.0671, eps0)
+            eps0 = 77.66 - 103.3 * theta1
+            eps1 = 0.0671 * eps0
             eps2 = 3.52
-            fp = np.dot((np.dot(316.0, theta1) + 146.4), theta1) + 20.2
+            fp = (316.0 * theta1 + 146.4) * theta1 + 20.2
             if LiqAbsModel.model == 'R03':
                 fp = 20.1 * np.exp(7.88 * theta1)
-            fs = np.dot(39.8, fp)
-            eps = (eps0 - eps1) / complex(1.0, freq / fp) + \
-                (eps1 - eps2) / complex(1.0, freq / fs) + eps2
+            fs = 39.8 * fp
+            eps = (eps0 - eps1) / (1.0 + 1j * (freq / fp)) + \
+                (eps1 - eps2) / (1.0 + 1j * (freq / fs)) + eps2
         elif LiqAbsModel.model in ['R17', 'R16', 'R19', 'R20', 'R19SD', 'R22SD']:
             eps = dilec12(freq, temp)
         else:
@@ -170,7 +185,7 @@ class LiqAbsModel(AbsModel):
 
         abliq = -0.06286 * np.imag(re) * freq * water
 
-        return abliq
+        return np.where(water > 0, abliq, 0.0)[()]
 
 
 class N2AbsModel(AbsModel):
@@ -191,7 +206,8 @@ class N2AbsModel(AbsModel):
             ValueError: Raises to error whether inputn model is unorrect or not available
 
         Returns:
-            np.ndarray: Nitrogen continum absorption terms in Np/km
+            np.ndarray: Nitrogen continum absorption terms in Np/km,
+            with shape (nlayers, nfreq) when both the atmospheric inputs and `f` are arrays
 
         References
         ----------
@@ -200,32 +216,43 @@ class N2AbsModel(AbsModel):
         .. [3] [Boissoles-2003]_.
         """
 
-        th = 300.0 / t
-        fdepen = 0.5 + 0.5 / (1.0 + (f / 450.0) ** 2)
-        if N2AbsModel.model in ['R16', 'R17', 'R18', 'R19', 'R19SD']:
-            l, m, n = 6.5e-14, 3.6, 1.34
-        elif N2AbsModel.model in ['R20', 'R20SD', 'R21SD', 'R22', 'R22SD']:
-            l, m, n = 9.95e-14, 3.22, 1
-        elif N2AbsModel.model == 'R03':
-            l, m, n = 6.5e-14, 3.6, 1.29
-        elif N2AbsModel.model in ['R98']:
-            l, m, n = 6.4e-14, 3.55, 1
-            fdepen = 1
-        else:
+        coeffs = _N2_COEFFS.get(N2AbsModel.model)
+        if coeffs is None:
             raise ValueError(
                 '[AbsN2] No model available with this name: {} . Sorry...'.format(N2AbsModel.model))
+        l, m, n, has_fdepen = coeffs
 
+        shape, f, t, p = _layers_by_freq(f, t, p)
+        th = 300.0 / t
+        fdepen = 0.5 + 0.5 / (1.0 + (f / 450.0) ** 2) if has_fdepen else 1
         bf = l * fdepen * p * p * f * f * th ** m
 
         abs_n2 = n * bf
 
-        return abs_n2
+        return np.reshape(abs_n2, shape)[()]
 
 
 class H2OAbsModel(AbsModel):
     """This class contains the :math:`H_2O` absorption model used in pyrtlib.
     """
 
+    #: Use Humlíček's W4 approximation of the complex error function for the
+    #: speed-dependent line shape, instead of the sixth-order approximation of
+    #: Hui et al. (default). W4 is used close to the real axis only: elsewhere the
+    #: speed-dependent shape cancels heavily near line centre and would magnify
+    #: its 1e-4 error to about 1e-3 at stratospheric pressures, so the default
+    #: function is used there. The absorption agrees with the default to about
+    #: 1e-5, at about the same speed.
+    humlicek = False
+
+    #: Evaluate the line shapes in single precision. The distances from line
+    #: centre and the line sum stay in double precision; results agree with
+    #: the default to about 1e-6. This only pays off for multi-frequency calls:
+    #: with one frequency per call, as in
+    #: :py:meth:`~pyrtlib.rt_equation.RTEquation.clearsky_absorption`, the
+    #: casts cost more than they save.
+    single_precision = False
+
     def __init__(self) -> None:
         super(H2OAbsModel, self).__init__()
         self._h2oll = None
@@ -261,7 +288,8 @@ class H2OAbsModel(AbsModel):
             frq (numpy.ndarray): Frequency (GHz) - (valid 0-1000 GHz).
 
         Returns:
-            Union[ Tuple[numpy.ndarray, numpy.ndarray], None]: WV line and continuum absorption terms (ppm)
+            Union[ Tuple[numpy.ndarray, numpy.ndarray], None]: WV line and continuum absorption terms (ppm),
+            with shape (nlayers, nfreq) when both the atmospheric inputs and `frq` are arrays
 
         References
         ----------
@@ -286,16 +314,16 @@ class H2OAbsModel(AbsModel):
 
                 AbsModel.model = 'R16'
                 H2OAbsModel.h2oll = import_lineshape('h2oll')
-                for i in range(0, len(z)):
-                    v = 300.0 / tk[i]
-                    ekpa = e[i] / 10.0
-                    pdrykpa = p[i] / 10.0 - ekpa
-                    for j in range(0, len(frq)):
-                        _, _ = H2OAbsModel().h2o_absorption(pdrykpa, v, ekpa, frq[j])
+                v = 300.0 / tk
+                ekpa = e / 10.0
+                pdrykpa = p / 10.0 - ekpa
+                npp, ncpp = H2OAbsModel().h2o_absorption(pdrykpa, v, ekpa, frq)
 
         """
+        # resolve the model once, all the branches below test this local
+        model = H2OAbsModel.model
         if amu:
-            if H2OAbsModel.model > 'R17':
+            if model > 'R17':
                 self.h2oll.cf = amu['con_Cf'].value
                 self.h2oll.cs = amu['con_Cs'].value
             else:
@@ -309,7 +337,7 @@ class H2OAbsModel(AbsModel):
             self.h2oll.w0s = amu['gamma_w'].value / 1000.0
             self.h2oll.x = amu['n_a'].value
             self.h2oll.xs = amu['n_w'].value
-            if H2OAbsModel.model > 'R17':
+            if model > 'R17':
                 self.h2oll.sh = amu['delta_a'].value / 1000.0
                 self.h2oll.shs = amu['delta_w'].value / 1000.0
                 self.h2oll.xh = amu['n_da'].value
@@ -321,185 +349,117 @@ class H2OAbsModel(AbsModel):
         # the best-fit voigt are given in koshelev et al. 2018, table 2 (rad,
         # mhz/torr). these correspond to w3(1) and ws(1) in h2o_list_r18 (mhz/mb)
 
+        # line list bound once, after the optional amu update
+        h2oll = self.h2oll
+        dtype = np.float32 if H2OAbsModel.single_precision else np.float64
+
         # cyh ***********************************************
-        db2np = np.log(10.0) * 0.1
+        shape, f, pdrykpa, vx, ekpa = _layers_by_freq(frq, pdrykpa, vx, ekpa)
         rvap = (0.01 * 8.31451) / 18.01528
-        factor = 0.182 * frq
+        # change of units from np/km to ppm
+        np2ppm = 1.0 / (_DB2NP * 0.182 * f)
         t = 300.0 / vx
         p = (pdrykpa + ekpa) * 10.0
         rho = ekpa * 10.0 / (rvap * t)
-        f = frq
         # cyh ***********************************************
 
-        if rho.any() <= 0.0:
-            npp = 0
-            ncpp = 0
+        # no absorption from the layers without water vapor
+        dry = rho <= 0.0
+        if np.all(dry):
+            npp = np.zeros(shape)[()]
+            ncpp = np.zeros(shape)[()]
             return npp, ncpp
 
         pvap = (rho * t) / 216.68
-        if H2OAbsModel.model in ['R03', 'R16', 'R17', 'R98']:
+        if model in ['R03', 'R16', 'R17', 'R98']:
             pvap = (rho * t) / 217.0
-        if H2OAbsModel.model in ['R22SD']:
-            pvap = (constants("Rwatvap")[0] * 1e-05) * rho * t
+        if model in ['R22SD']:
+            pvap = _RVAP * rho * t
         pda = p - pvap
-        if H2OAbsModel.model in ['R03', 'R16', 'R98']:
+        if model in ['R03', 'R16', 'R98']:
             den = 3.335e+16 * rho
         else:
             den = 3.344e+16 * rho
         # continuum terms
-        ti = self.h2oll.reftcon / t
+        ti = h2oll.reftcon / t
         # xcf and xcs include 3 for conv. to density & stimulated emission
-        if H2OAbsModel.model in ['R03', 'R98']:
+        if model in ['R03', 'R98']:
             con = (5.43e-10 * pda * ti ** 3 + 1.8e-08 *
                    pvap * ti ** 7.5) * pvap * f * f
         else:
-            con = (self.h2oll.cf * pda * ti ** self.h2oll.xcf + self.h2oll.cs * pvap * ti ** self.h2oll.xcs) * \
+            con = (h2oll.cf * pda * ti ** h2oll.xcf + h2oll.cs * pvap * ti ** h2oll.xcs) * \
                 pvap * f * f
         # 2019/03/18 *********************************************************
         # add resonances
-        nlines = len(self.h2oll.fl)
-        ti = self.h2oll.reftline / t
-        df = np.zeros((2, 1))
-
-        if H2OAbsModel.model.startswith(('R19SD', 'R20SD', 'R21SD', 'R22SD')):
-            tiln = np.log(ti)
-            ti2 = np.exp(2.5 * tiln)
-            summ = 0.0
-            for i in range(0, nlines):
-                width0 = self.h2oll.w0[i] * pda * ti ** self.h2oll.x[i] + \
-                    self.h2oll.w0s[i] * pvap * ti ** self.h2oll.xs[i]
-                width2 = self.h2oll.w2[i] * pda + self.h2oll.w2s[i] * pvap
-                if H2OAbsModel.model in ['R21SD', 'R22SD']:
-                    if self.h2oll.w2[i] > 0:
-                        width2 = self.h2oll.w2[i] * pda * ti ** self.h2oll.xw2[i] + self.h2oll.w2s[i] * pvap * ti ** \
-                            self.h2oll.xw2s[i]
-                    else:
-                        width2 = 0
-
-                shiftf = self.h2oll.sh[i] * pda * \
-                    (1. - self.h2oll.aair[i] * tiln) * ti ** self.h2oll.xh[i]
-                shifts = self.h2oll.shs[i] * pvap * \
-                    (1. - self.h2oll.aself[i] * tiln) * ti ** self.h2oll.xhs[i]
-                shift = shiftf + shifts
-                # thus using the best-fit voigt (shift instead of shift0 and shift2)
-                wsq = width0 ** 2
-                s = self.h2oll.s1[i] * ti2 * \
-                    np.exp(self.h2oll.b2[i] * (1. - ti))
-                df[0] = f - self.h2oll.fl[i] - shift
-                df[1] = f + self.h2oll.fl[i] + shift
-                base = width0 / (562500.0 + wsq)
-                if H2OAbsModel.model in ["R21SD", 'R22SD']:
-                    delta2 = self.h2oll.d2[i] * pda + self.h2oll.d2s[i] * pvap
-                res = 0.0
-                for j in range(0, 2):
-                    if width2 > 0 and j == 0 and np.abs(df[j]) < (10 * width0):
-                        # speed-dependent resonant shape factor, minus base
-                        xc = complex(
-                            (width0 - np.dot(1.5, width2)), df[j]) / width2
-                        if H2OAbsModel.model == 'R20SD':
-                            if i == 1:
-                                delta2 = (self.h2oll.d2air * pda) + \
-                                    (self.h2oll.d2self * pvap)
-                            else:
-                                delta2 = 0.0
-                            xc = complex((width0 - np.dot(1.5, width2)), df[j] + np.dot(1.5, delta2)) / complex(
-                                width2, -delta2)
-                        elif H2OAbsModel.model in ["R21SD", 'R22SD']:
-                            xc = complex(
-                                (width0 - 1.5 * width2), df[j] + 1.5 * delta2) / complex(width2, -delta2)
-
-                        xrt = np.sqrt(xc)
-                        pxw = 1.77245385090551603 * xrt * \
-                            _dcerror(-np.imag(xrt), np.real(xrt))
-                        sd = 2.0 * (1.0 - pxw) / (
-                            width2 if H2OAbsModel.model not in ['R20SD', 'R21SD', 'R22SD'] else complex(width2, -delta2))
-                        res += np.real(sd) - base
-                    elif np.abs(df[j]) < 750.0:
-                        res += width0 / (df[j] ** 2 + wsq) - base
-
-                summ += s * res * (f / self.h2oll.fl[i]) ** 2
-        elif H2OAbsModel.model in ['R16', 'R03', 'R17', 'R98']:
-            ti2 = ti ** 2.5
-            summ = 0.0
-            for i in range(0, nlines):
-                widthf = self.h2oll.w0[i] * pda * ti ** self.h2oll.x[i]
-                widths = self.h2oll.w0s[i] * pvap * ti ** self.h2oll.xs[i]
+        ti = h2oll.reftline / t
+        # temperature dependences ti ** x are evaluated as exp(x * ln(ti)) over all lines
+        tiln = np.log(ti)
+        ti2 = np.exp(2.5 * tiln)
+
+        if model in ['R19SD', 'R20SD', 'R21SD', 'R22SD']:
+            width0 = h2oll.w0 * pda * np.exp(tiln * h2oll.x) + \
+                h2oll.w0s * pvap * np.exp(tiln * h2oll.xs)
+            width2 = h2oll.w2 * pda + h2oll.w2s * pvap
+            delta2 = np.zeros(width0.shape)
+            if model in ['R21SD', 'R22SD']:
+                width2 = np.where(h2oll.w2 > 0, h2oll.w2 * pda * np.exp(tiln * h2oll.xw2) +
+                                  h2oll.w2s * pvap * np.exp(tiln * h2oll.xw2s), 0.0)
+                delta2 = h2oll.d2 * pda + h2oll.d2s * pvap
+            elif model == 'R20SD':
+                delta2[:, 1:2] = (h2oll.d2air * pda) + (h2oll.d2self * pvap)
+            shiftf = h2oll.sh * pda * \
+                (1. - h2oll.aair * tiln) * np.exp(tiln * h2oll.xh)
+            shifts = h2oll.shs * pvap * \
+                (1. - h2oll.aself * tiln) * np.exp(tiln * h2oll.xhs)
+            # thus using the best-fit voigt (shift instead of shift0 and shift2)
+            shift = shiftf + shifts
+            s = h2oll.s1 * ti2 * np.exp(h2oll.b2 * (1. - ti))
+            summ = _h2o_sdv_lines(f, h2oll.fl, width0, width2, delta2, shift, s,
+                                  _humlicek_w4_sd if H2OAbsModel.humlicek else _dcerror_points, dtype)
+        else:
+            if model in ['R16', 'R03', 'R17', 'R98']:
+                widthf = h2oll.w0 * pda * np.exp(tiln * h2oll.x)
+                widths = h2oll.w0s * pvap * np.exp(tiln * h2oll.xs)
                 width = widthf + widths
-                if H2OAbsModel.model == 'R98':
-                    shift = 0.0
+                if model == 'R98':
+                    shift = np.zeros(width.shape)
                 else:
-                    shift = self.h2oll.sr[i] * \
-                        (width if H2OAbsModel.model == 'R03' else widthf)
-                wsq = width ** 2
-                s = self.h2oll.s1[i] * ti2 * \
-                    np.exp(self.h2oll.b2[i] * (1.0 - ti))
-                df[0] = f - self.h2oll.fl[i] - shift
-                df[1] = f + self.h2oll.fl[i] + shift
-                # use clough's definition of local line contribution
-                base = width / (562500.0 + wsq)
-                # do for positive and negative resonances
-                res = 0.0
-                for j in range(0, 2):
-                    if np.abs(df[j]) <= 750.0:
-                        res += width / (df[j] ** 2 + wsq) - base
-                summ += s * res * (f / self.h2oll.fl[i]) ** 2
-        elif H2OAbsModel.model in ['R19', 'R20']:
-            tiln = np.log(ti)
-            ti2 = np.exp(2.5 * tiln)
-            summ = 0.0
-            for i in range(0, nlines):
-                widthf = self.h2oll.w0[i] * pda * ti ** self.h2oll.x[i]
-                widths = self.h2oll.w0s[i] * pvap * ti ** self.h2oll.xs[i]
+                    shift = h2oll.sr * \
+                        (width if model == 'R03' else widthf)
+            elif model in ['R19', 'R20']:
+                widthf = h2oll.w0 * pda * np.exp(tiln * h2oll.x)
+                widths = h2oll.w0s * pvap * np.exp(tiln * h2oll.xs)
                 width = widthf + widths
-                shiftf = self.h2oll.sh[i] * pda * \
-                    (1. - self.h2oll.aair[i] * tiln) * ti ** self.h2oll.xh[i]
-                shifts = self.h2oll.shs[i] * pvap * \
-                    (1. - self.h2oll.aself[i] * tiln) * ti ** self.h2oll.xhs[i]
+                shiftf = h2oll.sh * pda * \
+                    (1. - h2oll.aair * tiln) * np.exp(tiln * h2oll.xh)
+                shifts = h2oll.shs * pvap * \
+                    (1. - h2oll.aself * tiln) * np.exp(tiln * h2oll.xhs)
                 shift = shiftf + shifts
-                wsq = width ** 2
-                s = self.h2oll.s1[i] * ti2 * \
-                    np.exp(self.h2oll.b2[i] * (1. - ti))
-                df[0] = f - self.h2oll.fl[i] - shift
-                df[1] = f + self.h2oll.fl[i] + shift
-                base = width / (562500.0 + wsq)
-                res = 0.0
-                for j in range(0, 2):
-                    if np.abs(df[j]) < 750.0:
-                        res += width / (df[j] ** 2 + wsq) - base
-                summ += s * res * (f / self.h2oll.fl[i]) ** 2
-        elif H2OAbsModel.model == 'R18':
-            ti2 = ti ** 2.5
-            summ = 0.0
-            for i in range(0, nlines):
-                widthf = self.h2oll.w0[i] * pda * ti ** self.h2oll.x[i]
-                widths = self.h2oll.w0s[i] * pvap * ti ** self.h2oll.xs[i]
+            elif model == 'R18':
+                widthf = h2oll.w0 * pda * np.exp(tiln * h2oll.x)
+                widths = h2oll.w0s * pvap * np.exp(tiln * h2oll.xs)
                 width = widthf + widths
-                shiftf = self.h2oll.sh[i] * pda * ti ** self.h2oll.xh[i]
-                shifts = self.h2oll.shs[i] * pvap * ti ** self.h2oll.xhs[i]
+                shiftf = h2oll.sh * pda * np.exp(tiln * h2oll.xh)
+                shifts = h2oll.shs * pvap * np.exp(tiln * h2oll.xhs)
                 shift = shiftf + shifts
-                wsq = width ** 2
-                s = self.h2oll.s1[i] * ti2 * \
-                    np.exp(self.h2oll.b2[i] * (1. - ti))
-                df[0] = f - self.h2oll.fl[i] - shift
-                df[1] = f + self.h2oll.fl[i] + shift
-                base = width / (562500.0 + wsq)
-                res = 0.0
-                for j in range(0, 2):
-                    if np.abs(df[j]) < 750.0:
-                        res += width / (df[j] ** 2 + wsq) - base
-                summ += s * res * (f / self.h2oll.fl[i]) ** 2
+            s = h2oll.s1 * ti2 * np.exp(h2oll.b2 * (1. - ti))
+            summ = _h2o_lorentz_lines(f, h2oll.fl, width, shift, s,
+                                      model in ['R16', 'R03', 'R17', 'R98'], dtype)
         # separate the following original equ. into line and continuum
         # terms, and change the units from np/km to ppm
         # abh2o = .3183e-4*den*sum + con
-        if H2OAbsModel.model == 'R22SD':
+        if model == 'R22SD':
             h20m = 2.9915075E-23 # mass of water molecule (g)
-            npp = (1.e-10 * rho * summ / (np.pi * h20m) / db2np) / factor
+            npp = 1.e-10 * rho * summ / (np.pi * h20m) * np2ppm
         else:
-            npp = (3.1831e-05 * den * summ / db2np) / factor
+            npp = 3.1831e-05 * den * summ * np2ppm
 
-        ncpp = (con / db2np) / factor
+        ncpp = con * np2ppm
+        if np.any(dry):
+            npp = np.where(dry, 0.0, npp)
+            ncpp = np.where(dry, 0.0, ncpp)
 
-        return npp, ncpp
+        return np.reshape(npp, shape)[()], np.reshape(ncpp, shape)[()]
 
 
 class O2AbsModel(AbsModel):
@@ -530,7 +490,7 @@ class O2AbsModel(AbsModel):
                                 f"Model {O2AbsModel.model} is not available. It is necessary to define oxygen absorption model manually")
         O2AbsModel.o2ll = import_lineshape("o2ll")
 
-    def o2_absorption(self, pdrykpa: float, vx: float, ekpa: float, frq: float, amu: Optional[dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+    def o2_absorption(self, pdrykpa: np.ndarray, vx: np.ndarray, ekpa: np.ndarray, frq: np.ndarray, amu: Optional[dict] = None) -> Tuple[np.ndarray, np.ndarray]:
         """Returns power absorption coefficient due to oxygen in air in nepers/km.
 
         History:
@@ -555,7 +515,8 @@ class O2AbsModel(AbsModel):
             frq (numpy.ndarray): Frequency (GHz) - (valid 0-1000 GHz).
 
         Returns:
-            [numpy.ndarray]: Oxigen line and continuum absorption terms (ppm)
+            [numpy.ndarray]: Oxigen line and continuum absorption terms (ppm), with shape (nlayers, nfreq)
+            when both the atmospheric inputs and `frq` are arrays
 
         References
         ----------
@@ -583,6 +544,8 @@ class O2AbsModel(AbsModel):
          2. The same temperature dependence (X) is used for submillimeter
             line widths as in the 60 GHz band: (1/T)**X (Koshelev et al 2016).
         """
+        # resolve the model once, all the branches below test this local
+        model = O2AbsModel.model
 
         if amu:
             self.o2ll.w2a = amu['w2a'].value
@@ -599,7 +562,7 @@ class O2AbsModel(AbsModel):
             self.o2ll.x = amu['X05'].value
             self.o2ll.snr = amu['Snr'].value
             self.o2ll.ns = amu['O2_nS'].value
-            if O2AbsModel.model > 'R19':
+            if model > 'R19':
                 self.o2ll.y0 = amu['y0'].value
                 self.o2ll.y1 = amu['y1'].value
                 self.o2ll.dnu0 = amu['dnu0'].value
@@ -610,89 +573,70 @@ class O2AbsModel(AbsModel):
                 self.o2ll.v = amu['O2_V'].value
                 self.o2ll.v[34:49] = amu['O2_V_NL'].value[34:49]
 
+        # line list bound once, after the optional amu update
+        o2ll = self.o2ll
+
         # *** add the following lines *************************
-        db2np = np.log(10.0) * 0.1
+        shape, freq, pdrykpa, vx, ekpa = _layers_by_freq(frq, pdrykpa, vx, ekpa)
+
         rvap = (0.01 * 8.314510) / 18.01528
-        factor = 0.182 * frq
+        # change of units from np/km to ppm
+        np2ppm = 1.0 / (_DB2NP * 0.182 * freq)
         temp = 300.0 / vx
         pres = (pdrykpa + ekpa) * 10.0
         vapden = (ekpa * 10.0) / (rvap * temp)
-        freq = frq
         # *****************************************************
 
         th = 300.0 / temp
         th1 = th - 1.0
-        b = th ** self.o2ll.x
+        b = th ** o2ll.x
         preswv = vapden * temp / 216.68
-        if O2AbsModel.model in ['R03', 'R16', 'R17', 'R18', 'R98']:
+        if model in ['R03', 'R16', 'R17', 'R18', 'R98']:
             preswv = vapden * temp / 217.0
-        if O2AbsModel.model in ['R22', 'R22SD']:
+        if model in ['R22', 'R22SD']:
             preswv = 4.615228e-3 * vapden * temp
         presda = pres - preswv
         den = 0.001 * (presda * b + 1.2 * preswv * th)
-        if O2AbsModel.model in ['R03', 'R16', 'R98']:
+        if model in ['R03', 'R16', 'R98']:
             den = 0.001 * (presda * b + 1.1 * preswv * th)
-        if O2AbsModel.model == 'R03':
+        if model == 'R03':
             den = 0.001 * (presda * th ** 0.9 + 1.1 * preswv * th)
-        if O2AbsModel.model == 'R98':
+        if model == 'R98':
             den = 0.001 * (presda + 1.1 * preswv) * th
-        dfnr = self.o2ll.wb300 * den
+        dfnr = o2ll.wb300 * den
         pe2 = den * den
 
+        th3 = th ** 3
+        # shape of the non-resonant term, shared by the line sum and the continuum below
+        fsq = freq * freq
+        nrshape = fsq * dfnr / (th * (fsq + dfnr * dfnr))
         # intensities of the non-resonant transitions for o16-o16 and o16-o18, from jpl's line compilation
         # 1.571e-17 (o16-o16) + 1.3e-19 (o16-o18) = 1.584e-17
-        summ = 1.584e-17 * freq * freq * dfnr / \
-            (th * (freq * freq + dfnr * dfnr))
-        if O2AbsModel.model in ['R03', 'R16', 'R17', 'R18', 'R98']:
+        summ = 1.584e-17 * nrshape
+        if model in ['R03', 'R16', 'R17', 'R18', 'R98']:
             summ = 0.0
-        nlines = len(self.o2ll.f)
-        if O2AbsModel.model in ['R03', 'R98']:
-            for k in range(0, nlines):
-                if k == 0:
-                    df = self.o2ll.w300[0] * den
-                else:
-                    df = self.o2ll.w300[k] * den
-                y = 0.001 * pres * b * \
-                    (self.o2ll.y300[k] + self.o2ll.v[k] * th1)
-                strr = self.o2ll.s300[k] * np.exp(-self.o2ll.be[k] * th1)
-                sf1 = (df + (freq - self.o2ll.f[k]) * y) / \
-                    ((freq - self.o2ll.f[k]) ** 2 + df * df)
-                sf2 = (df - (freq + self.o2ll.f[k]) * y) / \
-                    ((freq + self.o2ll.f[k]) ** 2 + df * df)
-                summ += strr * (sf1 + sf2) * (freq / self.o2ll.f[k]) ** 2
-        elif O2AbsModel.model in ['R17', 'R18', 'R19', 'R19SD']:
-            for k in range(0, nlines):
-                df = self.o2ll.w300[k] * den
-                fcen = self.o2ll.f[k]
-                y = den * (self.o2ll.y300[k] + self.o2ll.v[k] * th1)
-                strr = self.o2ll.s300[k] * np.exp(-self.o2ll.be[k] * th1)
-                sf1 = (df + (freq - fcen) * y) / \
-                    ((freq - self.o2ll.f[k]) ** 2 + df * df)
-                sf2 = (df - (freq + fcen) * y) / \
-                    ((freq + self.o2ll.f[k]) ** 2 + df * df)
-                summ += strr * (sf1 + sf2) * (freq / self.o2ll.f[k]) ** 2
+        df = o2ll.w300 * den
+        strr = o2ll.s300 * np.exp(-o2ll.be * th1)
+        if model in ['R03', 'R98', 'R17', 'R18', 'R19', 'R19SD']:
+            if model in ['R03', 'R98']:
+                y = 0.001 * pres * b * (o2ll.y300 + o2ll.v * th1)
+            else:
+                y = den * (o2ll.y300 + o2ll.v * th1)
+            dnu = np.zeros(df.shape)
+            gfac = np.ones(df.shape)
         else:
-            for k in range(0, nlines):
-                df = self.o2ll.w300[k] * den
-                y = den * (self.o2ll.y0[k] + self.o2ll.y1[k] * th1)
-                dnu = pe2 * (self.o2ll.dnu0[k] + self.o2ll.dnu1[k] * th1)
-                strr = self.o2ll.s300[k] * np.exp(-self.o2ll.be[k] * th1)
-                del1 = freq - self.o2ll.f[k] - dnu
-                del2 = freq + self.o2ll.f[k] + dnu
-                gfac = 1. + pe2 * (self.o2ll.g0[k] + self.o2ll.g1[k] * th1)
-                d1 = del1 * del1 + df * df
-                d2 = del2 * del2 + df * df
-                sf1 = (df * gfac + del1 * y) / d1
-                sf2 = (df * gfac - del2 * y) / d2
-                summ += strr * (sf1 + sf2) * (freq / self.o2ll.f[k]) ** 2
-
-        o2abs = 1.6097e+11 * summ * presda * th ** 3
-        if O2AbsModel.model in ['R03', 'R98']:
-            o2abs = 5.034e+11 * summ * presda * th ** 3 / 3.14159
+            y = den * (o2ll.y0 + o2ll.y1 * th1)
+            dnu = pe2 * (o2ll.dnu0 + o2ll.dnu1 * th1)
+            gfac = 1. + pe2 * (o2ll.g0 + o2ll.g1 * th1)
+        summ += _o2_lines(freq, o2ll.f, df, y, dnu, gfac, strr)
+
+        o2abs = 1.6097e+11 * summ * presda * th3
+        if model in ['R03', 'R98']:
+            o2abs = 5.034e+11 * summ * presda * th3 / 3.14159
         # o2abs = 1.004 * np.maximum(o2abs, 0.0)
-        if O2AbsModel.model != 'R98':
+        if model != 'R98':
             o2abs = np.maximum(o2abs, 0.0)
-        if O2AbsModel.model in ['R20', 'R20SD', 'R22', 'R22SD']:
+        if model in ['R20', 'R20SD', 'R22', 'R22SD']:
             o2abs = 1.004 * np.maximum(o2abs, 0.0)
 
         # *** ********************************************************
@@ -702,29 +646,26 @@ class O2AbsModel(AbsModel):
         # intensities of the non-resonant transitions for o16-o16 and o16-o18, from jpl's line compilation
         # 1.571e-17 (o16-o16) + 1.3e-19 (o16-o18) = 1.584e-17
 
-        ncpp = 1.584e-17 * freq * freq * dfnr / \
-            (th * (freq * freq + dfnr * dfnr))
         #  .20946e-4/(3.14159*1.38065e-19*300) = 1.6097e11
         # a/(pi*k*t_0) = 0.20946/(3.14159*1.38065e-23*300) = 1.6097e19  - then it needs a factor 1e-8 to accont
         # for units conversion (pa->hpa, hz->ghz)
         # pa2hpa=1e-2; hz2ghz=1e-9; m2cm=1e2; m2km=1e-3; pa2hpa^-1 * hz2ghz * m2cm^-2 * m2km^-1 = 1e-8
         # th^3 = th(from ideal gas law 2.13) * th(from the mw approx of stimulated emission 2.16 vs. 2.14) *
         # th(from the partition sum 2.20)
-        if O2AbsModel.model in ['R03', 'R98']:
-            ncpp = 1.6e-17 * freq * freq * dfnr / \
-                (th * (freq * freq + dfnr * dfnr))
-            ncpp *= 5.034e+11 * presda * th ** 3 / 3.14159
-        else:
-            ncpp *= 1.6097e11 * presda * th ** 3  # n/pi*sum0
-        if O2AbsModel.model in ['R03', 'R16', 'R17', 'R18', 'R98']:
-            ncpp += N2AbsModel.n2_absorption(temp, pres, freq)
         # change the units from np/km to ppm
-        npp = (o2abs / db2np) / factor
-        ncpp = (ncpp / db2np) / factor
-        ncpp = 0 if O2AbsModel.model in [
-            'R19', 'R19SD', 'R20', 'R20SD', 'R22', 'R22SD'] else ncpp
+        npp = o2abs * np2ppm
+        # the newer models have no separate continuum
+        if model in ['R19', 'R19SD', 'R20', 'R20SD', 'R22', 'R22SD']:
+            ncpp = np.zeros(npp.shape)
+        else:
+            if model in ['R03', 'R98']:
+                ncpp = 1.6e-17 * nrshape * (5.034e+11 * presda * th3 / 3.14159)
+            else:
+                ncpp = 1.584e-17 * nrshape * (1.6097e11 * presda * th3)  # n/pi*sum0
+            ncpp += N2AbsModel.n2_absorption(np.ravel(temp), np.ravel(pres), freq)
+            ncpp *= np2ppm
 
-        return npp, ncpp
+        return np.reshape(npp, shape)[()], np.reshape(ncpp, shape)[()]
 
 
 class O3AbsModel(AbsModel):
@@ -777,10 +718,11 @@ class O3AbsModel(AbsModel):
             self.o3ll.x = amu['O3_X'].value
             self.o3ll.sr = amu['O3_SR'].value
 
-        if o3n.any() <= 0:
-            abs_o3 = 0
-            return
+        if np.all(o3n <= 0):
+            return 0.0
 
+        # line parameters bound once, outside the line loops
+        fl, w, x, s1, b = self.o3ll.fl, self.o3ll.w, self.o3ll.x, self.o3ll.s1, self.o3ll.b
         den = 1e-06 * o3n
         ti = self.o3ll.reftline / t
         ti2 = ti ** 2.5
@@ -790,36 +732,196 @@ class O3AbsModel(AbsModel):
         # factor is ok.
         if O3AbsModel.model in ["R22", "R22SD"]:
             summ = 0.0
-            nlines = len(self.o3ll.fl)
+            nlines = len(fl)
             for k in range(0, nlines):
-                if self.o3ll.fl[k] > (f + 1.0):
+                if fl[k] > (f + 1.0):
                     break
-                if self.o3ll.fl[k] >= (f - 1.0):
-                    widthc = self.o3ll.w[k] * p * ti ** self.o3ll.x[k]
-                    betad = .62065e-7 * self.o3ll.fl[k] * np.sqrt(t)
-                    arg1 = (self.o3ll.fl[k]-f)/betad
+                if fl[k] >= (f - 1.0):
+                    widthc = w[k] * p * ti ** x[k]
+                    betad = .62065e-7 * fl[k] * np.sqrt(t)
+                    arg1 = (fl[k]-f)/betad
                     arg2 = widthc/betad
-                    s = self.o3ll.s1[k] * np.exp(self.o3ll.b[k] * (1.0 - ti))
+                    s = s1[k] * np.exp(b[k] * (1.0 - ti))
                     summ += s * np.real(_dcerror(arg1, arg2))/betad
 
             abs_o3 = .56419e-4 * summ * qvinv * ti2 * den
         else:
             summ = 0.0
-            nlines = len(self.o3ll.fl)
+            nlines = len(fl)
             for k in range(0, nlines):
-                if self.o3ll.fl[k] > (f + 1.0):
+                if fl[k] > (f + 1.0):
                     break
-                if self.o3ll.fl[k] >= (f - 1.0):
-                    widthc = self.o3ll.w[k] * p * ti ** self.o3ll.x[k]
-                    betad2 = 3.85e-15 * t * self.o3ll.fl[k] ** 2
+                if fl[k] >= (f - 1.0):
+                    widthc = w[k] * p * ti ** x[k]
+                    betad2 = 3.85e-15 * t * fl[k] ** 2
                     # approximate width combines pressure and doppler broadening:
                     width = 0.5346 * widthc + \
                         np.sqrt(0.2166 * widthc * widthc + 0.6931 * betad2)
-                    s = self.o3ll.s1[k] * np.exp(self.o3ll.b[k] * (1.0 - ti))
-                    shape = (f / self.o3ll.fl[k]) ** 2 * width / \
-                        ((f - self.o3ll.fl[k]) ** 2 + width * width)
+                    s = s1[k] * np.exp(b[k] * (1.0 - ti))
+                    shape = (f / fl[k]) ** 2 * width / \
+                        ((f - fl[k]) ** 2 + width * width)
                     summ += s * shape
 
             abs_o3 = 3.183e-05 * summ * qvinv * ti2 * den
 
         return abs_o3
+
+
+def _layers_by_freq(frq: np.ndarray, *layers: np.ndarray) -> Tuple:
+    """Arrange the inputs of the absorption models for broadcasting: layers run
+    along the first axis and frequencies along the second.
+
+    :meta private:
+
+    Args:
+        frq (numpy.ndarray): Frequency (GHz), scalar or array.
+        *layers (numpy.ndarray): Atmospheric quantities, scalars or arrays of the same shape.
+
+    Returns:
+        Tuple: The shape of the result (the layer shape followed by the frequency shape),
+        the frequencies as an (nfreq,) array and each atmospheric quantity as an (nlayers, 1) column.
+    """
+    shape = np.broadcast(*layers).shape + np.shape(frq)
+    f = np.reshape(np.asarray(frq, dtype=np.float64), -1)
+
+    return (shape, f) + tuple(np.reshape(x, (-1, 1)) for x in layers)
+
+
+def _h2o_lorentz_lines(f: np.ndarray, fl: np.ndarray, width: np.ndarray, shift: np.ndarray, s: np.ndarray,
+                       cutoff_inclusive: bool = False, dtype: type = np.float64) -> np.ndarray:
+    """Line sum of the :math:`H_2O` resonances with Lorentzian shape, with Clough's
+    definition of local line contribution (the value at 750 GHz from line centre is subtracted).
+
+    :meta private:
+
+    Args:
+        f (numpy.ndarray): Frequencies (GHz), shape (nfreq,).
+        fl (numpy.ndarray): Line frequencies (GHz), shape (nlines,).
+        width (numpy.ndarray): Line widths (GHz), shape (nlayers, nlines).
+        shift (numpy.ndarray): Line shifts (GHz), shape (nlayers, nlines).
+        s (numpy.ndarray): Line intensities, shape (nlayers, nlines).
+        cutoff_inclusive (bool, optional): Whether lines exactly 750 GHz away are included. Defaults to False.
+        dtype (type, optional): Floating point type of the line shapes. The distances from line centre
+            are computed and the sum is accumulated in double precision regardless. Defaults to numpy.float64.
+
+    Returns:
+        numpy.ndarray: Sum over the lines, shape (nlayers, nfreq)
+    """
+    # lines along the second to last axis, frequencies along the last one
+    fl = fl[:, np.newaxis]
+    width = np.asarray(width[..., np.newaxis], dtype=dtype)
+    wsq = width ** 2
+    # positive and negative resonances stacked along a leading axis
+    flc = fl + shift[..., np.newaxis]
+    df = np.asarray(f - np.stack((flc, -flc)), dtype=dtype)
+    base = width / (562500.0 + wsq)
+    # the cutoff is applied as a mask
+    within = np.less_equal if cutoff_inclusive else np.less
+    res = within(np.abs(df), 750.0) * (width / (df * df + wsq) - base)
+    res = res[0] + res[1]
+
+    # the (f / fl) ** 2 factor is split: 1 / fl ** 2 goes with the intensities,
+    # f ** 2 is applied after the sum over the lines
+    return f * f * np.sum(np.asarray(s[..., np.newaxis] / (fl * fl), dtype=dtype) * res, axis=-2, dtype=np.float64)
+
+
+def _humlicek_w4_sd(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    r"""Complex error function for the speed-dependent line shape: Humlíček's W4 close
+    to the real axis (:math:`|x|+y < 5.5`), :py:func:`~pyrtlib.utils._dcerror` elsewhere.
+    Away from the real axis :math:`1 - \sqrt{\pi} z w` cancels heavily and would
+    magnify the error of W4 up to about 1e-3.
+
+    :meta private:
+
+    Args:
+        x (numpy.ndarray): Real part of the argument, shape (npoints,).
+        y (numpy.ndarray): Imaginary part of the argument, shape (npoints,).
+
+    Returns:
+        numpy.ndarray: Complex error function, shape (npoints,)
+    """
+    w = _humlicek_w4(x, y)
+    far = np.abs(x) + y >= 5.5
+    if np.any(far):
+        w[far] = _dcerror_points(x[far], y[far])
+
+    return w
+
+
+def _h2o_sdv_lines(f: np.ndarray, fl: np.ndarray, width0: np.ndarray, width2: np.ndarray, delta2: np.ndarray,
+                   shift: np.ndarray, s: np.ndarray, cerror: Callable = _dcerror_points,
+                   dtype: type = np.float64) -> np.ndarray:
+    """Line sum of the :math:`H_2O` resonances for the speed-dependent models. Near line centre
+    (within 10 widths) the positive resonance uses the speed-dependent Voigt shape, elsewhere
+    the Lorentzian shape is used. The Lorentzian sum is evaluated for all lines at once and
+    the few points near a line centre are then corrected together.
+
+    :meta private:
+
+    Args:
+        f (numpy.ndarray): Frequencies (GHz), shape (nfreq,).
+        fl (numpy.ndarray): Line frequencies (GHz), shape (nlines,).
+        width0 (numpy.ndarray): Best-fit Voigt widths (GHz), shape (nlayers, nlines).
+        width2 (numpy.ndarray): Speed-dependent widths (GHz), shape (nlayers, nlines).
+            Lines with zero width2 are Lorentzian.
+        delta2 (numpy.ndarray): Speed-dependent shifts (GHz), shape (nlayers, nlines).
+        shift (numpy.ndarray): Line shifts (GHz), shape (nlayers, nlines).
+        s (numpy.ndarray): Line intensities, shape (nlayers, nlines).
+        cerror (Callable, optional): Complex error function approximation, evaluated on arrays.
+            Defaults to :py:func:`~pyrtlib.utils._dcerror` applied point by point.
+        dtype (type, optional): Floating point type of the Lorentzian line shapes. Defaults to numpy.float64.
+
+    Returns:
+        numpy.ndarray: Sum over the lines, shape (nlayers, nfreq)
+    """
+    # lorentzian shape for all the lines and both resonances, as in the other models
+    summ = _h2o_lorentz_lines(f, fl, width0, shift, s, dtype=dtype)
+    # near line centre the positive resonance takes the speed-dependent shape:
+    # swap its lorentzian term for it (the base cancels).
+    # all the (layer, line, frequency) points to correct are gathered first
+    lay, i = np.nonzero(width2 > 0)
+    df0 = f - (fl[i] + shift[lay, i])[:, np.newaxis]
+    p, k = np.nonzero(np.abs(df0) < (10 * width0[lay, i])[:, np.newaxis])
+    lay, i, d = lay[p], i[p], df0[p, k]
+    w0, w2, d2 = width0[lay, i], width2[lay, i], delta2[lay, i]
+    w2c = w2 - 1j * d2
+    # speed-dependent resonant shape factor
+    xc = ((w0 - 1.5 * w2) + 1j * (d + 1.5 * d2)) / w2c
+    xrt = np.sqrt(xc)
+    pxw = 1.77245385090551603 * xrt * cerror(-xrt.imag, xrt.real)
+    sd = 2.0 * (1.0 - pxw) / w2c
+    np.add.at(summ, (lay, k), s[lay, i] * (sd.real - w0 / (d * d + w0 * w0)) * (f[k] / fl[i]) ** 2)
+
+    return summ
+
+
+def _o2_lines(freq: np.ndarray, fl: np.ndarray, df: np.ndarray, y: np.ndarray, dnu: np.ndarray, gfac: np.ndarray,
+              strr: np.ndarray) -> np.ndarray:
+    """Line sum of the :math:`O_2` resonances with first-order (y) and second-order
+    (dnu, gfac) line mixing. The older models have no second-order mixing (dnu = 0, gfac = 1).
+
+    :meta private:
+
+    Args:
+        freq (numpy.ndarray): Frequencies (GHz), shape (nfreq,).
+        fl (numpy.ndarray): Line frequencies (GHz), shape (nlines,).
+        df (numpy.ndarray): Line widths (GHz), shape (nlayers, nlines).
+        y (numpy.ndarray): First-order mixing coefficients, shape (nlayers, nlines).
+        dnu (numpy.ndarray): Line shifts (GHz), shape (nlayers, nlines).
+        gfac (numpy.ndarray): Second-order mixing factors, shape (nlayers, nlines).
+        strr (numpy.ndarray): Line intensities, shape (nlayers, nlines).
+
+    Returns:
+        numpy.ndarray: Sum over the lines, shape (nlayers, nfreq)
+    """
+    # lines along the second to last axis, frequencies along the last one
+    fl = fl[:, np.newaxis]
+    df, y, dnu, gfac, strr = (x[..., np.newaxis] for x in (df, y, dnu, gfac, strr))
+    dfsq = df * df
+    del1 = freq - fl - dnu
+    del2 = freq + fl + dnu
+    sf1 = (df * gfac + del1 * y) / (del1 * del1 + dfsq)
+    sf2 = (df * gfac - del2 * y) / (del2 * del2 + dfsq)
+
+    # (freq / fl) ** 2 with freq ** 2 applied after the sum over the lines
+    return freq * freq * np.sum(strr / (fl * fl) * (sf1 + sf2), axis=-2)
@@ -7,14 +7,27 @@ __author__ = ''
 __date__ = 'March 2021'
 __copyright__ = '(C) 2021, CNR-IMAA'
 
+import math
 import warnings
 from typing import Tuple, Optional, Union
 
 import numpy as np
 
-from .absorption_model import O2AbsModel, H2OAbsModel, N2AbsModel, LiqAbsModel, O3AbsModel
+from .absorption_model import O2AbsModel, H2OAbsModel, N2AbsModel, LiqAbsModel, O3AbsModel, _DB2NP, _RVAP
 from .utils import constants, tk2b_mod
 
+# universal constants used by the RTE, looked up once at import
+_EARTH_RADIUS = constants('EarthRadius')[0]
+_PLANCK = constants('planck')[0]
+_BOLTZMANN = constants('boltzmann')[0]
+_TCOSMIC = constants('Tcosmicbkg')[0]
+_LIGHT_CM = constants('light')[0] * 100
+
+# static conversion factors and limits
+_GHZ2HZ = 1e9
+_LN10 = math.log(10.0)
+_EXPMAX = 125.0  # largest optical depth that is exponentiated
+
 
 class RTEquation:
     """This class contains the main Radiative Transfer Equation functions.
@@ -40,10 +53,6 @@ class RTEquation:
             * rho (np.ndarray): Vapor density (:math:`g/m^3`)
         """
 
-        rvap = constants('Rwatvap')[0]
-
-        rvap = np.dot(rvap, 1e-05)
-
         # if ( (tk > 263.16) | (ice==0) )
         #    # for water...
         #    y = 373.16 ./ tk;
@@ -58,25 +67,26 @@ class RTEquation:
         #          0.876793 * (1.- (1. ./ y)) + log10(6.1071);
         # end
 
+        # powers of ten are evaluated as exp(ln10 * x), 10^x - 1 as expm1(ln10 * x)
         # over water...
         y = 373.16 / t
-        es = np.dot(-7.90298, (y - 1.0)) + np.dot(5.02808, np.log10(y)) - np.dot(1.3816e-07, (
-            10 ** (np.dot(11.344, (1.0 - (1.0 / y)))) - 1.0)) + np.dot(0.0081328, (
-                10 ** (np.dot(-3.49149, (y - 1.0))) - 1.0)) + np.log10(1013.246)
+        es = -7.90298 * (y - 1.0) + 5.02808 * np.log10(y) - \
+            1.3816e-07 * np.expm1(_LN10 * 11.344 * (1.0 - (1.0 / y))) + \
+            0.0081328 * np.expm1(_LN10 * -3.49149 * (y - 1.0)) + np.log10(1013.246)
         if ice:
             # over ice if tk < 263.16
-            indx = np.nonzero(t < 263.16)
-            y = 273.16 / t(indx)
-            es[indx] = np.dot(-9.09718, (y - 1.0)) - np.dot(
-                3.56654, np.log10(y)) + np.dot(0.876793, (1.0 - (1.0 / y))) + np.log10(6.1071)
+            y = 273.16 / t
+            es_ice = -9.09718 * (y - 1.0) - 3.56654 * np.log10(y) + \
+                0.876793 * (1.0 - (1.0 / y)) + np.log10(6.1071)
+            es = np.where(t < 263.16, es_ice, es)
 
-        es = 10.0 ** es
+        es = np.exp(_LN10 * es)
         # Compute vapor pressure and vapor density.
         # The vapor density conversion follows the ideal gas law:
         # vapor pressure = vapor density * rvapor * tk
 
-        e = np.multiply(rh, es)
-        rho = e / (np.dot(rvap, t))
+        e = rh * es
+        rho = e / (_RVAP * t)
 
         return e, rho
 
@@ -122,27 +132,17 @@ class RTEquation:
             * refindx (numpy.ndarray): Refractive index profile
         """
 
-        nl = len(p)
-        wetn = np.zeros(p.shape)
-        dryn = np.zeros(p.shape)
-        refindx = np.zeros(p.shape)
-
-        for i in range(0, nl):
-            # Calculate dry air pressure (pa) and celsius temperature (tc).
-            pa = p[i] - e[i]
-            tc = t[i] - 273.16
-            tk2 = np.dot(t[i], t[i])
-            tc2 = np.dot(tc, tc)
-            rza = 1.0 + \
-                np.dot(
-                    pa, (np.dot(5.79e-07, (1.0 + 0.52 / t[i])) - np.dot(0.00094611, tc) / tk2))
-            rzw = 1.0 + np.dot(np.dot(1650.0, (e[i] / (np.dot(t[i], tk2)))),
-                               (1.0 - np.dot(0.01317, tc) + np.dot(0.000175, tc2) + np.dot(1.44e-06,
-                                                                                           (np.dot(tc2, tc)))))
-            wetn[i] = np.dot((np.dot(64.79, (e[i] / t[i])) +
-                             np.dot((377600.0), (e[i] / tk2))), rzw)
-            dryn[i] = np.dot(np.dot(77.6036, (pa / t[i])), rza)
-            refindx[i] = 1.0 + np.dot((dryn[i] + wetn[i]), 1e-06)
+        # Calculate dry air pressure (pa) and celsius temperature (tc).
+        pa = p - e
+        tc = t - 273.16
+        tk2 = t * t
+        tc2 = tc * tc
+        rza = 1.0 + pa * (5.79e-07 * (1.0 + 0.52 / t) - 0.00094611 * tc / tk2)
+        rzw = 1.0 + 1650.0 * (e / (t * tk2)) * \
+            (1.0 - 0.01317 * tc + 0.000175 * tc2 + 1.44e-06 * (tc2 * tc))
+        wetn = (64.79 * (e / t) + 377600.0 * (e / tk2)) * rzw
+        dryn = 77.6036 * (pa / t) * rza
+        refindx = 1.0 + (dryn + wetn) * 1e-06
 
         return dryn, wetn, refindx
 
@@ -165,82 +165,19 @@ class RTEquation:
             The algorithm assumes that x decays exponentially over each layer.
         """
 
-        deg2rad = np.pi / 180
-        re = constants('EarthRadius')[0]
-        ds = np.zeros(z.shape)
-
-        nl = len(z)
         # Check for refractive index values that will blow up calculations.
-        for i in range(0, nl):
-            if refindx[i] < 1:
-                warnings.warn('ray_tracing: Negative rafractive index')
-                return
+        if np.any(refindx < 1):
+            warnings.warn('ray_tracing: Negative rafractive index')
+            return
 
         # If angle is close to 90 degrees, make ds a height difference profile.
-        if (angle >= 89 and angle <= 91) or (angle >= -91 and angle <= -89):
-            ds[0] = 0.0
-            for i in range(1, nl):
-                ds[i] = z[i] - z[i - 1]
+        if 89 <= abs(angle) <= 91:
+            ds = np.zeros(z.shape)
+            ds[1:] = np.diff(z)
             return ds
 
         # The rest of the subroutine applies only to angle other than 90 degrees.
-        # Convert angle degrees to radians.  Initialize constant values.
-        theta0 = np.dot(angle, deg2rad)
-        rs = re + z[0] + z0
-        costh0 = np.cos(theta0)
-        sina = np.sin(np.dot(theta0, 0.5))
-        a0 = np.dot(2.0, (sina ** 2))
-        # Initialize lower boundary values for 1st layer.
-        ds[0] = 0.0
-        phil = 0.0
-        taul = 0.0
-        rl = re + z[0] + z0
-        tanthl = np.tan(theta0)
-        # Construct the slant path length profile.
-        for i in range(1, nl):
-            r = re + z[i] + z0
-            if refindx[i] == refindx[i - 1] or refindx[i] == 1. or refindx[i - 1] == 1.:
-                refbar = np.dot((refindx[i] + refindx[i - 1]), 0.5)
-            else:
-                refbar = 1.0 + (refindx[i - 1] - refindx[i]) / \
-                    (np.log((refindx[i - 1] - 1.0) / (refindx[i] - 1.0)))
-            argdth = z[i] / rs - \
-                (np.dot((refindx[0] - refindx[i]), costh0) / refindx[i])
-            argth = np.dot(0.5, (a0 + argdth)) / r
-            if argth <= 0:
-                warnings.warn(
-                    'ray_tracing: Ducting at {} degrees'.format(angle))
-                return ds
-            # Compute d-theta for this layer.
-            sint = np.sqrt(np.dot(r, argth))
-            theta = np.dot(2.0, np.arcsin(sint))
-            if (theta - np.dot(2.0, theta0)) <= 0.0:
-                dendth = np.dot(np.dot(2.0, (sint + sina)),
-                                np.cos(np.dot((theta + theta0), 0.25)))
-                sind4 = (np.dot(0.5, argdth) - np.dot(z[i], argth)) / dendth
-                dtheta = np.dot(4.0, np.arcsin(sind4))
-                theta = theta0 + dtheta
-            else:
-                dtheta = theta - theta0
-            # Compute d-tau for this layer (eq.3.71) and add to integral, tau.
-            tanth = np.tan(theta)
-            cthbar = np.dot(((1.0 / tanth) + (1.0 / tanthl)), 0.5)
-            dtau = np.dot(cthbar, (refindx[i - 1] - refindx[i])) / refbar
-            tau = taul + dtau
-            phi = dtheta + tau
-            ds[i] = np.sqrt(
-                (z[i] - z[i - 1]) ** 2 + np.dot(np.dot(np.dot(4.0, r), rl), ((np.sin(np.dot((phi - phil), 0.5))) ** 2)))
-            if dtau != 0.0:
-                dtaua = np.abs(tau - taul)
-                ds[i] = np.dot(
-                    ds[i], (dtaua / (np.dot(2.0, np.sin(np.dot(dtaua, 0.5))))))
-            # Make upper boundary into lower boundary for next layer.
-            phil = np.copy(phi)
-            taul = np.copy(tau)
-            rl = np.copy(r)
-            tanthl = np.copy(tanth)
-
-        return np.asarray(ds)
+        return _ray_tracing_layers(z, refindx, angle, z0, _EARTH_RADIUS)
 
     @staticmethod
     def exponential_integration(zeroflg: bool, x: np.ndarray, ds: np.ndarray, ibeg: int, iend: int, factor: float) -> Tuple[np.ndarray, np.ndarray]:
@@ -261,30 +198,32 @@ class RTEquation:
             * sxds (numpy.ndarray): Integral of x*ds over levels ibeg to iend
         """
 
-        sxds = 0.0
         xds = np.zeros(ds.shape)
         # TODO: check index
-        for i in range(ibeg, iend):
-            # Check for negative x value. If found, output message and return.
-            if x[i - 1] < 0.0 or x[i] < 0.0:
-                warnings.warn('Error encountered in exponential_integration')
-                return sxds, xds
-                # Find a layer value for x in cases where integration algorithm fails.
-            elif np.abs(x[i] - x[i - 1]) < 1e-09:
-                xlayer = x[i]
-            elif x[i - 1] == 0.0 or x[i] == 0.0:
-                if not zeroflg:
-                    xlayer = 0.0
-                else:
-                    xlayer = np.dot((x[i] + x[i - 1]), 0.5)
-            else:
-                # Find a layer value for x assuming exponential decay over the layer.
-                xlayer = (x[i] - x[i - 1]) / np.log(x[i] / x[i - 1])
-            # Integrate x over the layer and save the result in xds.
-            xds[i] = np.dot(xlayer, ds[i])
-            sxds = sxds + xds[i]
-
-        sxds = np.dot(sxds, factor)
+        i = np.arange(ibeg, iend)
+        x0 = x[i - 1]
+        x1 = x[i]
+        # Check for negative x value. If found, output message and return
+        # the integral up to the first negative layer.
+        neg = np.flatnonzero((x0 < 0.0) | (x1 < 0.0))
+        if neg.size:
+            i, x0, x1 = i[:neg[0]], x0[:neg[0]], x1[:neg[0]]
+        # Find a layer value for x assuming exponential decay over the layer.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xlayer = (x1 - x0) / np.log(x1 / x0)
+        # Find a layer value for x in cases where integration algorithm fails.
+        xlayer = np.where((x0 == 0.0) | (x1 == 0.0),
+                          (x1 + x0) * 0.5 if zeroflg else 0.0, xlayer)
+        xlayer = np.where(np.abs(x1 - x0) < 1e-09, x1, xlayer)
+        # Integrate x over the layer and save the result in xds.
+        xds[i] = xlayer * ds[i]
+        sxds = np.sum(xds)
+
+        if neg.size:
+            warnings.warn('Error encountered in exponential_integration')
+            return sxds, xds
+
+        sxds = sxds * factor
 
         # TODO: reashape xds array
         return sxds, xds.reshape(iend)
@@ -314,12 +253,10 @@ class RTEquation:
             hvk, tauprof, and boftatm can be obtained from subroutine :py:meth:`planck`.
         """
 
-        # maximum absolute value for exponential function argument
-        expmax = 125.0
         ibase = int(ibase)
         itop = int(itop)
         # check if absorption too large to exponentiate
-        if tauprof[ibase] > expmax:
+        if tauprof[ibase] > _EXPMAX:
             warnings.warn(
                 'from cloud_radiating_temperature: absorption too large to exponentiate for tmr of lowest cloud layer')
             return
@@ -328,11 +265,11 @@ class RTEquation:
         # (if taucld is too large to exponentiate, treat it as infinity.)
         batmcld = boftatm[itop] - boftatm[ibase]
         taucld = tauprof[itop] - tauprof[ibase]
-        if taucld > expmax:
-            boftcld = np.dot(batmcld, np.exp(tauprof[ibase]))
+        e_ib = math.exp(tauprof[ibase])
+        if taucld > _EXPMAX:
+            boftcld = batmcld * e_ib
         else:
-            boftcld = (
-                batmcld * np.exp(tauprof[ibase])) / (1.0 - np.exp(-taucld))
+            boftcld = batmcld * e_ib / -math.expm1(-taucld)
 
         # compute cloud mean radiating temperature (tmrcld)
         tmrcld = RTEquation.bright(hvk, boftcld)
@@ -356,11 +293,12 @@ class RTEquation:
         ncld = len(lbase)
         scld = 0.0
         for i in range(0, ncld):
-            for j in range(int(lbase[i]) + 1, int(ltop[i])):
-                scld += np.dot(ds[j], (np.dot(0.5, (dencld[j] + dencld[j - 1]))))
+            ib = int(lbase[i])
+            it = int(ltop[i])
+            scld += np.sum(ds[ib + 1:it + 1] * (0.5 * (dencld[ib + 1:it + 1] + dencld[ib:it])))
 
         # convert the integrated value to cm.
-        scld = np.dot(scld, 0.1)
+        scld = scld * 0.1
 
         return scld
 
@@ -392,68 +330,38 @@ class RTEquation:
             * tauprof: Array of integrated absorption (np; 0,i).
         """
 
-        Tc = constants('Tcosmicbkg')[0]
-        h = constants('planck')[0]
-        k = constants('boltzmann')[0]
-        fHz = np.dot(frq, 1e9)
+        fHz = frq * 1e9
 
-        hvk = np.dot(fHz, h) / k
-        # maximum absolute value for exponential function argument
-        expmax = 125.0
+        hvk = fHz * _PLANCK / _BOLTZMANN
         nl = len(t)
-        tauprof = np.zeros(taulay.shape)
-        boftatm = np.zeros(taulay.shape)
-        boft = np.zeros(taulay.shape)
+        boft = tk2b_mod(hvk, t)
+        boftatm, tauprof = _planck_layers(boft, taulay, RTEquation._from_sat)
 
         if RTEquation._from_sat:
             boftotl = 0.0
-            ###########################################################################
-            # Then compute upwelling radiance
-            # Adapted from Planck_xxx.m, but from Satellite i-1 becomes i+1
-            # taulay changed to i+1, debugged by ISMAR project
-            ###########################################################################
             Ts = t[0]
-            boft[nl - 1] = tk2b_mod(hvk, t[nl - 1])
-            for i in range(nl - 2, -1, -1):
-                boft[i] = tk2b_mod(hvk, t[i])
-                boftlay = (boft[i + 1] + np.dot(boft[i],
-                           np.exp(-taulay[i+1]))) / (1.0 + np.exp(-taulay[i+1]))
-                batmlay = np.dot(
-                    np.dot(boftlay, np.exp(-tauprof[i + 1])), (1.0 - np.exp(-taulay[i+1])))
-                boftatm[i] = boftatm[i + 1] + batmlay
-                tauprof[i] = tauprof[i + 1] + taulay[i+1]
-
             # The background is a combination of surface emission and downwelling
             # radiance (boftotl) reflected by the surface
-            if tauprof[0] < expmax:
-                boftbg = np.dot(RTEquation._emissivity, tk2b_mod(
-                    hvk, Ts)) + np.dot((1 - RTEquation._emissivity), boftotl)
+            if tauprof[0] < _EXPMAX:
+                boftbg = RTEquation._emissivity * tk2b_mod(hvk, Ts) + \
+                    (1 - RTEquation._emissivity) * boftotl
                 # boftbg_sat  = es * TK2B_mod(hvk,Ts); # SAT: eps * B(Tsrf) + (1-eps) B_dw
-                bakgrnd = np.dot(boftbg, np.exp(-tauprof[0]))
+                bakgrnd = boftbg * np.exp(-tauprof[0])
                 boftotl = bakgrnd + boftatm[0]
-                boftmr = boftatm[0] / (1.0 - np.exp(-tauprof[0]))
+                boftmr = boftatm[0] / -np.expm1(-tauprof[0])
             else:
                 bakgrnd = 0.0
                 boftotl = boftatm[0]
                 boftmr = boftatm[0]
         else:
-            boft[0] = tk2b_mod(hvk, t[0])
-            for i in range(1, nl):
-                boft[i] = tk2b_mod(hvk, t[i])
-                boftlay = (boft[i - 1] + boft[i] *
-                           np.exp(-taulay[i])) / (1.0 + np.exp(-taulay[i]))
-                batmlay = boftlay * \
-                    np.exp(- tauprof[i - 1]) * (1.0 - np.exp(-taulay[i]))
-                boftatm[i] = boftatm[i - 1] + batmlay
-                tauprof[i] = tauprof[i - 1] + taulay[i]
             # compute the cosmic background term of the rte; compute total planck
             # radiance for atmosphere and cosmic background; if absorption too large
             # to exponentiate, assume cosmic background was completely attenuated.
-            if tauprof[nl - 1] < expmax:
-                boftbg = tk2b_mod(hvk, Tc)
+            if tauprof[nl - 1] < _EXPMAX:
+                boftbg = tk2b_mod(hvk, _TCOSMIC)
                 bakgrnd = boftbg * np.exp(-tauprof[nl - 1])
                 boftotl = bakgrnd + boftatm[nl - 1]
-                boftmr = boftatm[nl - 1] / (1.0 - np.exp(-tauprof[nl - 1]))
+                boftmr = boftatm[nl - 1] / -np.expm1(-tauprof[nl - 1])
             else:
                 bakgrnd = 0.0
                 boftotl = boftatm[nl - 1]
@@ -483,26 +391,15 @@ class RTEquation:
 
         """
 
-        nl = len(t)
-        c = np.dot(constants('light')[0], 100)
-
-        ghz2hz = 1e9
-        db2np = np.dot(np.log(10.0), 0.1)
-
-        wave = c / (np.dot(frq, ghz2hz))
+        wave = _LIGHT_CM / (frq * _GHZ2HZ)
 
+        # Compute liquid absorption np/km.
         aliq = np.zeros(denl.shape)
-        aice = np.zeros(denl.shape)
-        for i in range(0, nl):
-            # Compute liquid absorption np/km.
-            if denl[i] > 0:
-                aliq[i] = LiqAbsModel.liquid_water_absorption(
-                    denl[i], frq, t[i])
-            # compute ice absorption (db/km); convert non-zero value to np/km.
-            if deni[i] > 0:
-                aice[i] = np.dot(
-                    np.dot((8.18645 / wave), deni[i]), 0.000959553)
-                aice[i] = np.dot(aice[i], db2np)
+        mask = denl > 0
+        if mask.any():
+            aliq[mask] = LiqAbsModel.liquid_water_absorption(denl[mask], frq, t[mask])
+        # compute ice absorption (db/km); convert non-zero value to np/km.
+        aice = np.where(deni > 0, (8.18645 / wave) * deni * 0.000959553 * _DB2NP, 0.0)
 
         return aliq, aice
 
@@ -533,37 +430,172 @@ class RTEquation:
             :py:func:`~pyrtlib.absorption_model.O2AbsModel.o2_absorption`
         """
 
+        if not N2AbsModel.model:
+            raise ValueError(
+                'No model avalaible with this name: {} . Sorry...'.format('model'))
+
         nl = len(p)
-        awet = np.zeros(p.shape)
-        adry = np.zeros(p.shape)
-        aO2 = np.zeros(p.shape)
         aN2 = np.zeros(p.shape)
         aO3 = np.zeros(p.shape)
-        factor = np.dot(0.182, frq)
-        db2np = np.dot(np.log(10.0), 0.1)
-        for i in range(0, nl):
-            # Compute inverse temperature parameter; convert wet and dry p to kpa.
-            v = 300.0 / t[i]
-            ekpa = e[i] / 10.0
-            pdrykpa = p[i] / 10.0 - ekpa
-            # add H2O term
-            npp, ncpp = H2OAbsModel().h2o_absorption(pdrykpa, v, ekpa, frq, amu)
-            awet[i] = factor * (npp + ncpp) * db2np
-            # add O2 term
-            npp, ncpp = O2AbsModel().o2_absorption(pdrykpa, v, ekpa, frq, amu)
-            aO2[i] = factor * (npp + ncpp) * db2np
-            # add N2 term
-            if N2AbsModel.model not in ['R03', 'R16', 'R17', 'R18', 'R98']:
-                aN2[i] = N2AbsModel.n2_absorption(
-                    t[i], np.dot(pdrykpa, 10), frq)
-
-            if not N2AbsModel.model:
-                raise ValueError(
-                    'No model avalaible with this name: {} . Sorry...'.format('model'))
-
-            if isinstance(o3n, np.ndarray) and O3AbsModel.model in ['R18', 'R21', 'R21SD', 'R22', 'R22SD']:
-                aO3[i] = O3AbsModel().o3_absorption(t[i], p[i], frq, o3n[i], amu)
-
-            adry[i] = aO2[i] + aN2[i] + aO3[i]
+        factor = 0.182 * frq
+        # Compute inverse temperature parameter; convert wet and dry p to kpa.
+        v = 300.0 / t
+        ekpa = e / 10.0
+        pdrykpa = p / 10.0 - ekpa
+        h2o_abs = H2OAbsModel()
+        o2_abs = O2AbsModel()
+        o3_abs = O3AbsModel() if isinstance(o3n, np.ndarray) and O3AbsModel.model in [
+            'R18', 'R21', 'R21SD', 'R22', 'R22SD'] else None
+        # add H2O term
+        npp, ncpp = h2o_abs.h2o_absorption(pdrykpa, v, ekpa, frq, amu)
+        awet = factor * (npp + ncpp) * _DB2NP
+        # add O2 term
+        npp, ncpp = o2_abs.o2_absorption(pdrykpa, v, ekpa, frq, amu)
+        aO2 = factor * (npp + ncpp) * _DB2NP
+        # add O3 term
+        if o3_abs is not None:
+            for i in range(0, nl):
+                aO3[i] = o3_abs.o3_absorption(t[i], p[i], frq, o3n[i], amu)
+
+        # add N2 term
+        if N2AbsModel.model not in ['R03', 'R16', 'R17', 'R18', 'R98']:
+            aN2 = N2AbsModel.n2_absorption(t, pdrykpa * 10, frq)
+
+        adry = aO2 + aN2 + aO3
 
         return awet, adry
+
+
+def _ray_tracing_layers(z: np.ndarray, refindx: np.ndarray, angle: float, z0: float, re: float) -> np.ndarray:
+    """Layer loop of :py:meth:`RTEquation.ray_tracing` for angles other than 90 degrees.
+
+    The loop carries phi, tau, r and tan(theta) from one layer to the next, so it
+    cannot be vectorized; it is written with scalar :py:mod:`math` calls only.
+
+    :meta private:
+
+    Args:
+        z (numpy.ndarray): Height profile (km above observation height, z0).
+        refindx (numpy.ndarray): Refractive index profile.
+        angle (float): Elevation angle (degrees).
+        z0 (float): Observation height (km msl).
+        re (float): Earth radius (km).
+
+    Returns:
+        numpy.ndarray: Array containing slant path length profiles (km)
+    """
+
+    nl = len(z)
+    ds = np.zeros(z.shape)
+    # The loop runs on plain Python floats: indexing numpy arrays element by
+    # element would box every value into a numpy scalar.
+    zl = z.tolist()
+    rf = refindx.tolist()
+    # Convert angle degrees to radians.  Initialize constant values.
+    theta0 = math.radians(angle)
+    rez0 = re + z0
+    rs = rez0 + zl[0]
+    costh0 = math.cos(theta0)
+    sina = math.sin(theta0 * 0.5)
+    a0 = 2.0 * (sina ** 2)
+    # Initialize lower boundary values for 1st layer.
+    ds[0] = 0.0
+    phil = 0.0
+    taul = 0.0
+    rl = rs
+    tanthl = math.tan(theta0)
+    zlo = zl[0]
+    reflo = rf[0]
+    # Construct the slant path length profile.
+    for i in range(1, nl):
+        zi = zl[i]
+        refi = rf[i]
+        r = rez0 + zi
+        if refi == reflo or refi == 1. or reflo == 1.:
+            refbar = (refi + reflo) * 0.5
+        else:
+            refbar = 1.0 + (reflo - refi) / (math.log((reflo - 1.0) / (refi - 1.0)))
+        argdth = zi / rs - ((rf[0] - refi) * costh0 / refi)
+        argth = 0.5 * (a0 + argdth) / r
+        if argth <= 0:
+            warnings.warn(
+                'ray_tracing: Ducting at {} degrees'.format(angle))
+            return ds
+        # Compute d-theta for this layer.
+        sint = math.sqrt(r * argth)
+        theta = 2.0 * math.asin(sint)
+        if (theta - 2.0 * theta0) <= 0.0:
+            dendth = 2.0 * (sint + sina) * math.cos((theta + theta0) * 0.25)
+            sind4 = (0.5 * argdth - zi * argth) / dendth
+            dtheta = 4.0 * math.asin(sind4)
+            theta = theta0 + dtheta
+        else:
+            dtheta = theta - theta0
+        # Compute d-tau for this layer (eq.3.71) and add to integral, tau.
+        tanth = math.tan(theta)
+        cthbar = ((1.0 / tanth) + (1.0 / tanthl)) * 0.5
+        dtau = cthbar * (reflo - refi) / refbar
+        tau = taul + dtau
+        phi = dtheta + tau
+        dsi = math.sqrt((zi - zlo) ** 2 + 4.0 * r * rl * (math.sin((phi - phil) * 0.5)) ** 2)
+        if dtau != 0.0:
+            dtaua = abs(tau - taul)
+            dsi = dsi * (dtaua / (2.0 * math.sin(dtaua * 0.5)))
+        ds[i] = dsi
+        # Make upper boundary into lower boundary for next layer.
+        phil = phi
+        taul = tau
+        rl = r
+        tanthl = tanth
+        zlo = zi
+        reflo = refi
+
+    return ds
+
+
+def _planck_layers(boft: np.ndarray, taulay: np.ndarray, from_sat: bool) -> Tuple[np.ndarray, np.ndarray]:
+    r"""Layer integration of :py:meth:`RTEquation.planck`.
+
+    Integrates the modified Planck radiance and the absorption from the antenna
+    (level 0 for ground-based, level nl-1 from satellite) to every profile level.
+    Both integral profiles are running sums over the layers and are evaluated with
+    ``np.cumsum``; :math:`1-e^{-\tau_{lay}}` is computed with ``expm1``, which stays
+    accurate for optically thin layers.
+
+    :meta private:
+
+    Args:
+        boft (numpy.ndarray): Modified planck function for raob temperature profile.
+        taulay (numpy.ndarray): Layer absorption profile (np).
+        from_sat (bool): Whether the radiance is upwelling (satellite) or downwelling.
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray]:
+
+        * boftatm: Array of atmospheric planck radiance integrated (0,i).
+        * tauprof: Array of integrated absorption (np; 0,i).
+    """
+
+    tauprof = np.zeros(taulay.shape)
+    boftatm = np.zeros(taulay.shape)
+    # layer i lies between levels i-1 and i
+    em = np.exp(-taulay[1:])
+    one_m_em = -np.expm1(-taulay[1:])
+
+    if from_sat:
+        ###########################################################################
+        # Then compute upwelling radiance
+        # Adapted from Planck_xxx.m, but from Satellite i-1 becomes i+1
+        # taulay changed to i+1, debugged by ISMAR project
+        ###########################################################################
+        tauprof[:-1] = np.cumsum(taulay[:0:-1])[::-1]
+        boftlay = (boft[1:] + boft[:-1] * em) / (1.0 + em)
+        batmlay = boftlay * np.exp(-tauprof[1:]) * one_m_em
+        boftatm[:-1] = np.cumsum(batmlay[::-1])[::-1]
+    else:
+        tauprof[1:] = np.cumsum(taulay[1:])
+        boftlay = (boft[:-1] + boft[1:] * em) / (1.0 + em)
+        batmlay = boftlay * np.exp(-tauprof[:-1]) * one_m_em
+        boftatm[1:] = np.cumsum(batmlay)
+
+    return boftatm, tauprof
@@ -324,16 +324,17 @@ class TbCloudRTE(object):
                     self.z, refindx, self.angles[k], self.z0)
             else:
                 amass = 1 / np.sin(self.angles[k] * np.pi / 180)
-                ds = np.append([0], np.diff(self.z) * amass)
+                ds = np.zeros(self.nl)
+                ds[1:] = np.diff(self.z) * amass
             # ds = [0; diff(z)]; # in alternative simple diff of z
 
             # Integrate over path (ds)
             self.srho[:, k], _ = RTEquation.exponential_integration(
-                True, rho, ds, 0, self.nl, 0.1)
+                True, rho, ds, 1, self.nl, 0.1)
             self.swet[:, k], _ = RTEquation.exponential_integration(
-                True, wetn, ds, 0, self.nl, 0.1)
+                True, wetn, ds, 1, self.nl, 0.1)
             self.sdry[:, k], _ = RTEquation.exponential_integration(
-                True, dryn, ds, 0, self.nl, 0.1)
+                True, dryn, ds, 1, self.nl, 0.1)
             if self.cloudy:
                 self.sliq[:, k] = RTEquation.cloud_integrated_density(
                     self.denliq, ds, self.beglev, self.endlev)
@@ -379,9 +380,9 @@ class TbCloudRTE(object):
                 self.tbatm[j, k] = RTEquation.bright(hvk, boftatm[self.nl - 1])
                 self.tmr[j, k] = RTEquation.bright(hvk, boftmr)
 
-        df = pd.DataFrame()
+        dfs = []
         for i, a in enumerate(self.angles):
-            df_i = pd.DataFrame({'tbtotal': self.tbtotal.T[i],
+            dfs.append(pd.DataFrame({'tbtotal': self.tbtotal.T[i],
                                  'tbatm': self.tbatm.T[i],
                                  'tmr': self.tmr.T[i],
                                  'tmrcld': self.tmrcld.T[i],
@@ -390,8 +391,8 @@ class TbCloudRTE(object):
                                  'tauliq': self.sptauliq.T[i],
                                  'tauice': self.sptauice.T[i],
                                  'angle': np.full((len(self.frq),), a)
-                                 })
-            df = pd.concat([df, df_i])
+                                 }))
+        df = pd.concat(dfs)
 
         if only_bt:
             return df
@@ -1,6 +1,8 @@
 import os
 # from pathlib import Path
 from unittest import TestCase
+import numpy as np
+from numpy.testing import assert_allclose
 from pyrtlib.absorption_model import (H2OAbsModel, O2AbsModel,
                                       N2AbsModel, LiqAbsModel)
 
@@ -29,6 +31,16 @@ class Test(TestCase):
         if hasattr(H2OAbsModel, 'model'):
             assert H2OAbsModel.model != 'PIPPO'
 
+    def test_lineshape_reload(self):
+        O2AbsModel.model = 'R22'
+        O2AbsModel.set_ll()
+        w300 = O2AbsModel.o2ll.w300.copy()
+        # the amu parameters are written in place into the line list
+        O2AbsModel.o2ll.w300[0:5] = 0.0
+
+        O2AbsModel.set_ll()
+        assert_allclose(O2AbsModel.o2ll.w300, w300, atol=0)
+
     def test_absn2(self):
         N2AbsModel.model = 'R22SD'
         absn2 = N2AbsModel.n2_absorption(267., 800., 55.0034)
@@ -38,11 +50,121 @@ class Test(TestCase):
         absn2 = N2AbsModel.n2_absorption(267., 800., 55.0034)
         assert absn2 != 0.000278315910216229
 
+        t = np.array([267., 220.])
+        p = np.array([800., 100.])
+        frq = np.array([55.0034, 183.31, 600.])
+        absn2 = N2AbsModel.n2_absorption(t, p, frq)
+        assert absn2.shape == (len(t), len(frq))
+        for i in range(len(t)):
+            assert_allclose(absn2[i], N2AbsModel.n2_absorption(t[i], p[i], frq), atol=0)
+
     def test_absliq(self):
         LiqAbsModel.model = 'R22SD'
         absliq = LiqAbsModel.liquid_water_absorption(0.05, 183.0034, 270.)
         assert absliq == 0.09822164244021624
+        assert np.ndim(absliq) == 0 and not isinstance(absliq, np.ndarray)
 
         LiqAbsModel.model = 'R98'
         absliq = LiqAbsModel.liquid_water_absorption(0.05, 183.0034, 270.)
         assert absliq != 0.09822164244021624
+
+    def test_absliq_array(self):
+        water = np.array([0.0, 0.05, 0.2, -0.1])
+        temp = np.array([250., 270., 290., 300.])
+        for model in ['R98', 'R03', 'R22SD']:
+            LiqAbsModel.model = model
+            absliq = LiqAbsModel.liquid_water_absorption(water, 183.0034, temp)
+            expected = [LiqAbsModel.liquid_water_absorption(w, 183.0034, t) for w, t in zip(water, temp)]
+            assert_allclose(absliq, expected, atol=0)
+            assert absliq[0] == 0.0 and absliq[3] == 0.0
+
+    def test_absh2o_frequencies(self):
+        frq = np.array([22.235, 50., 183.31, 183.0, 325.15])
+        pdrykpa, vx, ekpa = np.float64(101.0), np.float64(300. / 290.), np.float64(2.0)
+        for model in ['R98', 'R18', 'R20', 'R20SD', 'R22SD']:
+            H2OAbsModel.model = model
+            H2OAbsModel.set_ll()
+            npp, ncpp = H2OAbsModel().h2o_absorption(pdrykpa, vx, ekpa, frq)
+            expected = np.array([H2OAbsModel().h2o_absorption(pdrykpa, vx, ekpa, f) for f in frq])
+            assert npp.shape == frq.shape
+            assert_allclose(npp, expected[:, 0], rtol=1e-12)
+            assert_allclose(ncpp, expected[:, 1], rtol=1e-12)
+
+    def test_absorption_layers(self):
+        frq = np.array([22.235, 60., 118.75, 183.31])
+        pdrykpa = np.array([99.0, 50.0, 10.0])
+        vx = 300. / np.array([295., 260., 220.])
+        ekpa = np.array([2.0, 0.2, 0.001])
+        for model in ['R98', 'R17', 'R20SD', 'R22SD']:
+            H2OAbsModel.model = model
+            H2OAbsModel.set_ll()
+            O2AbsModel.model = 'R22' if model == 'R22SD' else model
+            O2AbsModel.set_ll()
+            for absorption in [H2OAbsModel().h2o_absorption, O2AbsModel().o2_absorption]:
+                npp, ncpp = absorption(pdrykpa, vx, ekpa, frq)
+                assert npp.shape == ncpp.shape == (len(pdrykpa), len(frq))
+                for i in range(len(pdrykpa)):
+                    npp_i, ncpp_i = absorption(pdrykpa[i], vx[i], ekpa[i], frq)
+                    assert_allclose(npp[i], npp_i, rtol=1e-12)
+                    assert_allclose(ncpp[i], ncpp_i, rtol=1e-12)
+
+    def test_absh2o_dry(self):
+        H2OAbsModel.model = 'R22SD'
+        H2OAbsModel.set_ll()
+        frq = np.array([22.235, 183.31])
+        npp, ncpp = H2OAbsModel().h2o_absorption(99.0, 1.0, 0.0, frq)
+        assert_allclose(npp, 0.0, atol=0)
+        assert_allclose(ncpp, 0.0, atol=0)
+
+        npp, ncpp = H2OAbsModel().h2o_absorption(np.array([99.0, 50.0]), np.array([1.0, 1.1]),
+                                                 np.array([2.0, 0.0]), frq)
+        assert np.all(npp[0] > 0) and np.all(ncpp[0] > 0)
+        assert_allclose(npp[1], 0.0, atol=0)
+        assert_allclose(ncpp[1], 0.0, atol=0)
+
+    def test_absh2o_single_precision(self):
+        frq = np.arange(20., 200., 3.7)
+        pdrykpa = np.array([99.0, 50.0, 10.0, 0.1])
+        vx = 300. / np.array([295., 260., 220., 270.])
+        ekpa = np.array([2.0, 0.2, 0.001, 1e-6])
+        for model in ['R17', 'R22SD']:
+            H2OAbsModel.model = model
+            H2OAbsModel.set_ll()
+            npp, ncpp = H2OAbsModel().h2o_absorption(pdrykpa, vx, ekpa, frq)
+            H2OAbsModel.single_precision = True
+            try:
+                npp32, ncpp32 = H2OAbsModel().h2o_absorption(pdrykpa, vx, ekpa, frq)
+            finally:
+                H2OAbsModel.single_precision = False
+            assert npp32.dtype == np.float64
+            assert_allclose(npp32, npp, rtol=1e-5)
+            assert_allclose(ncpp32, ncpp, atol=0)
+
+    def test_absh2o_humlicek(self):
+        frq = np.array([22.235, 22.24, 183.31, 183.4, 325.15])
+        pdrykpa = np.array([99.0, 50.0, 10.0, 0.1])
+        vx = 300. / np.array([295., 260., 220., 270.])
+        ekpa = np.array([2.0, 0.2, 0.001, 1e-6])
+        for model in ['R20SD', 'R22SD']:
+            H2OAbsModel.model = model
+            H2OAbsModel.set_ll()
+            npp, ncpp = H2OAbsModel().h2o_absorption(pdrykpa, vx, ekpa, frq)
+            H2OAbsModel.humlicek = True
+            try:
+                npp_w4, ncpp_w4 = H2OAbsModel().h2o_absorption(pdrykpa, vx, ekpa, frq)
+            finally:
+                H2OAbsModel.humlicek = False
+            assert_allclose(npp_w4, npp, rtol=1e-5)
+            assert_allclose(ncpp_w4, ncpp, atol=0)
+
+        # dense grid around the line centre at stratospheric pressures
+        frq = np.linspace(183.30, 183.32, 201)
+        pdrykpa = np.array([1.0, 0.1, 0.01])
+        vx = 300. / np.array([230., 220., 220.])
+        npp, _ = H2OAbsModel().h2o_absorption(pdrykpa, vx, pdrykpa * 1e-3, frq)
+        H2OAbsModel.humlicek = True
+        try:
+            npp_w4, _ = H2OAbsModel().h2o_absorption(pdrykpa, vx, pdrykpa * 1e-3, frq)
+        finally:
+            H2OAbsModel.humlicek = False
+        assert_allclose(npp_w4, npp, rtol=2e-5)
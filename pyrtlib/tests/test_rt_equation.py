@@ -0,0 +1,46 @@
+from unittest import TestCase
+import numpy as np
+from numpy.testing import assert_allclose
+from pyrtlib.rt_equation import RTEquation
+from pyrtlib.utils import esice_goffgratch
+
+
+class Test(TestCase):
+    def test_vapor_ice(self):
+        t = np.array([250., 260., 270., 290.])
+        rh = np.array([0.5, 0.6, 0.7, 0.8])
+
+        e_wat, _ = RTEquation.vapor(t, rh)
+        e_ice, rho_ice = RTEquation.vapor(t, rh, ice=True)
+
+        assert_allclose(e_ice[2:], e_wat[2:], atol=0)
+        assert_allclose(e_ice[:2], rh[:2] * esice_goffgratch(t[:2]), rtol=1e-2)
+        assert np.all(e_ice[:2] < e_wat[:2])
+        assert_allclose(rho_ice, e_ice / (461.52e-5 * t), atol=0)
+
+    def test_cloud_integrated_density(self):
+        ds = np.array([0., 1., 1., 1., 1., 1.])
+        dencld = np.array([0., 1., 1., 1., 0., 0.])
+
+        scld = RTEquation.cloud_integrated_density(dencld, ds, np.array([1.]), np.array([3.]))
+        assert_allclose(scld, 0.2, atol=0)
+
+        scld = RTEquation.cloud_integrated_density(dencld, ds, np.array([1., 1.]), np.array([3., 4.]))
+        assert_allclose(scld, 0.45, atol=0)
+
+    def test_exponential_integration(self):
+        ds = np.array([0., 1., 1., 1., 1.])
+        x = np.array([4., 2., 2., 0., 1.])
+
+        sxds, xds = RTEquation.exponential_integration(True, x, ds, 1, 5, 0.1)
+        assert_allclose(xds, [0., 2. / np.log(2.), 2., 1., 0.5], atol=0)
+        assert_allclose(sxds, 0.1 * np.sum(xds), atol=0)
+
+        sxds, xds = RTEquation.exponential_integration(False, x, ds, 1, 5, 0.1)
+        assert_allclose(xds, [0., 2. / np.log(2.), 2., 0., 0.], atol=0)
+
+        x[3] = -1.
+        with self.assertWarns(UserWarning):
+            sxds, xds = RTEquation.exponential_integration(True, x, ds, 1, 5, 0.1)
+        assert_allclose(xds, [0., 2. / np.log(2.), 2., 0., 0.], atol=0)
+        assert_allclose(sxds, np.sum(xds), atol=0)
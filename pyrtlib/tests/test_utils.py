@@ -6,7 +6,8 @@ from pyrtlib.absorption_model import H2OAbsModel
 from pyrtlib.climatology import AtmosphericProfiles as atmp
 from pyrtlib.utils import (ppmv2gkg, mr2rh, gas_mass, height_to_pressure, pressure_to_height, constants,
                            to_kelvin, to_celsius, get_frequencies_sat, get_frequencies, eswat_goffgratch, satvap, satmix,
-                           import_lineshape, atmospheric_tickness, mr2rho, mr2e, esice_goffgratch, rho2mr)
+                           import_lineshape, atmospheric_tickness, mr2rho, mr2e, esice_goffgratch, rho2mr,
+                           _dcerror, _humlicek_w4)
 
 z, p, d, t, md = atmp.gl_atm(atmp.TROPICAL)
 
@@ -291,3 +292,12 @@ class Test(TestCase):
                             1.19097392e-04, 3.63686345e-04, 9.23737220e-03, 3.22861540e-01,
                             4.46886926e+01, 3.25249157e+03])
         assert_almost_equal(eice_ex, eice, decimal=5)
+
+    def test_humlicek_w4(self):
+        x = np.array([-40., -6., -1., 0., 0.5, 3., 12.])
+        y = np.array([0.001, 0.1, 0.5, 1., 4., 8., 20.])
+        w4 = _humlicek_w4(x[:, np.newaxis], y)
+        expected = np.array([[_dcerror(xi, yi) for yi in y] for xi in x])
+        assert w4.shape == (len(x), len(y))
+        assert_allclose(w4, expected, rtol=1e-4)
+        assert_allclose(_humlicek_w4(0.5, 1.), _dcerror(0.5, 1.), rtol=1e-4)
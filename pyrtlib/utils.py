@@ -6,6 +6,7 @@ __author__ = ''
 __date__ = 'March 2021'
 __copyright__ = '(C) 2021, CNR-IMAA'
 
+import cmath
 import types
 from typing import Tuple, Optional, Union, List
 import sys
@@ -558,7 +559,7 @@ def dilec12(f: np.ndarray, t: np.ndarray) -> np.ndarray:
     """
 
     tc = t - 273.15
-    z = complex(0.0, f)
+    z = 1j * f
     theta = 300.0 / t
     # static dielectric constant model from
     # Patek et al. (J.Phys.Chem.Ref.Data. v.38(1), 21 (2009).
@@ -589,6 +590,16 @@ def dilec12(f: np.ndarray, t: np.ndarray) -> np.ndarray:
     return kappa
 
 
+# coefficients of the rational approximation in _dcerror, as plain floats
+# so that the evaluation stays in Python complex arithmetic
+_DCERROR_A = (122.607931777104326, 214.382388694706425, 181.928533092181549,
+              93.155580458138441, 30.180142196210589, 5.912626209773153,
+              0.564189583562615)
+_DCERROR_B = (122.607931773875350, 352.730625110963558, 457.334478783897737,
+              348.703917719495792, 170.354001821091472, 53.992906912940207,
+              10.479857114260399)
+
+
 def _dcerror(x: np.ndarray, y: np.ndarray) -> np.ndarray:
     r"""Sixth-Order Approx To The Complex Error Function of
 
@@ -613,22 +624,12 @@ def _dcerror(x: np.ndarray, y: np.ndarray) -> np.ndarray:
     # DOUBLE PRECISION X,Y,a(0:6),b(0:6)
     # DOUBLE COMPLEX ASUM,BSUM,ZH,w
 
-    a = np.asarray([
-        122.607931777104326, 214.382388694706425, 181.928533092181549,
-        93.155580458138441, 30.180142196210589, 5.912626209773153,
-        0.564189583562615
-    ])
-
-    b = np.asarray([
-        122.607931773875350, 352.730625110963558, 457.334478783897737,
-        348.703917719495792, 170.354001821091472, 53.992906912940207,
-        10.479857114260399
-    ])
+    a, b = _DCERROR_A, _DCERROR_B
 
     # compute w in quadrants 1 or 2
     # from eqs.(13), w(z) = [w(-z*)]*
     # expansion in terms of ZH results in conjugation of w when X changes sign.
-    zh = complex(np.abs(y), -x)
+    zh = complex(abs(y), -x)
     asum = (((((a[6] * zh + a[5]) * zh + a[4]) * zh + a[3]) * zh + a[2]) * zh +
             a[1]) * zh + a[0]
     bsum = (((((
@@ -639,11 +640,68 @@ def _dcerror(x: np.ndarray, y: np.ndarray) -> np.ndarray:
         dcerror = w
     else:
         # from eqs.(13), w(z) = 2exp(-z^2)-[w(z*)]*
-        dcerror = 2.0 * np.exp(-complex(x, y) ** 2) - w
+        dcerror = 2.0 * cmath.exp(-complex(x, y) ** 2) - w
 
     return dcerror
 
 
+def _humlicek_w4(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    r"""Humlíček's W4 approximation to the complex probability (Faddeeva) function of
+
+    .. math:: z = x+iy
+    .. math:: w(z) = \exp(-z^2)\times erfc(-iz)
+
+    The upper half-plane (:math:`y \geq 0`) is split in four regions, each with its own
+    rational approximation; for :math:`|x|+y \geq 15` the asymptotic form
+    :math:`iz/(\sqrt{\pi}(z^2-0.5))` is used. The relative accuracy is about :math:`10^{-4}`.
+    Works on scalars and arrays.
+
+    :meta private:
+
+    Args:
+        x (numpy.ndarray): Real part of z.
+        y (numpy.ndarray): Imaginary part of z (:math:`y \geq 0`).
+
+    Returns:
+        numpy.ndarray: The complex probability function w(z)
+
+    References
+    ----------
+    .. [1] J. Humlíček, JQSRT v.27, pp.437-444 (1982).
+    .. [2] F. Schreier, JQSRT v.112, pp.1010-1025 (2011).
+    """
+
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+    t = np.atleast_1d(y - 1j * x)
+    s = np.atleast_1d(np.abs(x) + y)
+    w = np.empty(t.shape, dtype=np.complex128)
+
+    r1 = s >= 15.0
+    r2 = (s >= 5.5) & ~r1
+    r3 = (s < 5.5) & np.atleast_1d(y >= 0.195 * np.abs(x) - 0.176)
+    r4 = ~(r1 | r2 | r3)
+    # region I: asymptotic form
+    tt = t[r1]
+    w[r1] = tt * 0.5641896 / (0.5 + tt * tt)
+    # region II
+    tt = t[r2]
+    u = tt * tt
+    w[r2] = tt * (1.410474 + u * 0.5641896) / (0.75 + u * (3.0 + u))
+    # region III
+    tt = t[r3]
+    w[r3] = (16.4955 + tt * (20.20933 + tt * (11.96482 + tt * (3.778987 + tt * 0.5642236)))) / \
+        (16.4955 + tt * (38.82363 + tt * (39.27121 + tt * (21.69274 + tt * (6.699398 + tt)))))
+    # region IV: close to the real axis
+    tt = t[r4]
+    u = tt * tt
+    w[r4] = np.exp(u) - tt * (36183.31 - u * (3321.9905 - u * (1540.787 - u * (219.0313 - u * (
+        35.76683 - u * (1.320522 - u * 0.56419)))))) / \
+        (32066.6 - u * (24322.84 - u * (9022.228 - u * (2186.181 - u * (364.2191 - u * (
+            61.57037 - u * (1.841439 - u)))))))
+
+    return w.reshape(x.shape)[()]
+
+
 def pressure_to_height(pressure: float) -> float:
     r"""Convert pressure data to height using the U.S. standard atmosphere [NOAA1976]_.
     The implementation uses the formula outlined in [Hobbs1977]_ pg.60-61.